@@ -0,0 +1 @@
+"""Shared helpers used by the AI Hub Streamlit apps."""
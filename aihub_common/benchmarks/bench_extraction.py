@@ -0,0 +1,82 @@
+"""Benchmark the shared PDF extraction against the per-app functions it replaced.
+
+Run from the repository root (needs PyMuPDF and PyPDF2):
+
+    python -m aihub_common.benchmarks.bench_extraction            # 10, 100 and 1000 pages
+    python -m aihub_common.benchmarks.bench_extraction 50 500     # custom page counts
+
+The last column extracts page ranges in a pool of one process per available CPU.
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+import PyPDF2
+from aihub_common.extraction import _import_pymupdf, extract_pdf_text
+from aihub_common.processes import available_cpus
+
+DEFAULT_PAGE_COUNTS = [10, 100, 1000]
+LINES_PER_PAGE = 45
+
+def make_pdf(pages):
+    """A synthetic PDF with a page of numbered text lines per page"""
+    pymupdf = _import_pymupdf()
+    doc = pymupdf.open()
+    for number in range(pages):
+        page = doc.new_page()
+        text = "\n".join(
+            f"Page {number + 1} line {line}: the quick brown fox jumps over the lazy dog"
+            for line in range(LINES_PER_PAGE)
+        )
+        page.insert_text((50, 50), text, fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def legacy_pypdf2(pdf_file):
+    """extract_text_from_pdf as copied into pdfchatbot, resume-extractor, token-llm-cost-estimator and clone-your-own-voice"""
+    pdf_reader = PyPDF2.PdfReader(pdf_file)
+    text = ""
+    for page in pdf_reader.pages:
+        text += page.extract_text()
+    return text
+
+def legacy_pymupdf_tempfile(data):
+    """extract_text_from_pdf from clinical-document-summarizer (temp file round-trip)"""
+    pymupdf = _import_pymupdf()
+    text = ""
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
+        tmp_file.write(data)
+        tmp_file.flush()
+        with pymupdf.open(tmp_file.name) as doc:
+            for page in doc:
+                text += page.get_text("text") + "\n"
+        os.unlink(tmp_file.name)
+    return text.strip()
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def main():
+    page_counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_PAGE_COUNTS
+    processes = available_cpus()
+    columns = ["legacy PyPDF2", "shared PyPDF2", "legacy PyMuPDF", "shared PyMuPDF", f"{processes} procs"]
+    print(f"{'pages':>6} " + " ".join(f"{name:>15}" for name in columns))
+    for pages in page_counts:
+        data = make_pdf(pages)
+        legacy_pypdf2_time, legacy_text = timed(legacy_pypdf2, io.BytesIO(data))
+        shared_pypdf2_time, shared_text = timed(extract_pdf_text, data, backend="pypdf2")
+        legacy_pymupdf_time, _ = timed(legacy_pymupdf_tempfile, data)
+        shared_pymupdf_time, single_text = timed(extract_pdf_text, data, backend="pymupdf")
+        parallel_time, parallel_text = timed(extract_pdf_text, data, backend="pymupdf", processes=processes)
+        assert parallel_text == single_text
+        # Same page texts; the shared version only adds a newline between pages
+        assert shared_text.replace("\n", "") == legacy_text.replace("\n", "")
+        times = [legacy_pypdf2_time, shared_pypdf2_time, legacy_pymupdf_time, shared_pymupdf_time, parallel_time]
+        print(f"{pages:>6} " + " ".join(f"{seconds:>14.3f}s" for seconds in times))
+
+if __name__ == "__main__":
+    main()
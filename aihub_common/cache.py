@@ -0,0 +1,254 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Where shared caches live; override with AIHUB_CACHE_DIR
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "aihub")
+
+# LLM response cache defaults; override with the matching environment variables
+DEFAULT_LLM_CACHE_TTL = 7 * 24 * 60 * 60  # AIHUB_LLM_CACHE_TTL, seconds
+DEFAULT_LLM_CACHE_MAX_MB = 256  # AIHUB_LLM_CACHE_MAX_MB
+
+
+def cache_dir() -> str:
+    """Return the directory shared caches are stored in, creating it if needed."""
+    path = os.getenv("AIHUB_CACHE_DIR", DEFAULT_CACHE_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class SQLiteCache:
+    """Persistent key-value cache in a single SQLite file.
+
+    Values are JSON-serializable objects stored as zlib-compressed blobs. Entries
+    expire after their TTL, and once the stored size exceeds max_bytes the least
+    recently used entries are evicted. Hit/miss counters are persisted alongside
+    the data so savings can be tracked across restarts. Safe to share between
+    threads, and between processes through SQLite's own locking.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_LLM_CACHE_MAX_MB * 1024 * 1024,
+                 default_ttl: Optional[float] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _bump(self, name: str):
+        self._conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] is not None and row[1] <= now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._bump("misses")
+                return default
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._bump("hits")
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store value under key, expiring after ttl seconds (default_ttl if omitted)."""
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, expires_at, now)
+            )
+            self._evict(now)
+
+    def delete(self, key: str):
+        """Remove key from the cache if present."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM counters")
+
+    def _evict(self, now: float):
+        """Drop expired entries, then least recently used ones until under max_bytes."""
+        self._conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        while total > self.max_bytes:
+            oldest = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not oldest:
+                break
+            for key, size in oldest:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._bump("evictions")
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters plus the current entry count and size."""
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+
+def llm_cache_key(model: str, prompt: str, system: Optional[str] = None,
+                  temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+    """Content-addressed key for one LLM request."""
+    payload = json.dumps(
+        {
+            "model": model,
+            "system": system,
+            "prompt": prompt,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_llm_cache: Optional[SQLiteCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[SQLiteCache]:
+    """Return the process-wide LLM response cache, or None if AIHUB_LLM_CACHE=0."""
+    global _llm_cache
+    if os.getenv("AIHUB_LLM_CACHE", "1") == "0":
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = SQLiteCache(
+                os.path.join(cache_dir(), "llm_cache.sqlite3"),
+                max_bytes=int(os.getenv("AIHUB_LLM_CACHE_MAX_MB", DEFAULT_LLM_CACHE_MAX_MB)) * 1024 * 1024,
+                default_ttl=float(os.getenv("AIHUB_LLM_CACHE_TTL", DEFAULT_LLM_CACHE_TTL)),
+            )
+        return _llm_cache
+
+
+def cached_completion(generate: Callable[[], str], model: str, prompt: str, system: Optional[str] = None,
+                      temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+    """Return the cached completion for these inputs, calling generate() on a miss.
+
+    Empty completions are returned but not stored.
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        return generate()
+
+    key = llm_cache_key(model, prompt, system, temperature, max_tokens)
+    try:
+        cached = cache.get(key)
+    except sqlite3.Error as e:
+        logger.warning(f"LLM cache read failed: {str(e)}")
+        cached = None
+    if cached is not None:
+        return cached
+
+    text = generate()
+    if text:
+        try:
+            cache.set(key, text)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {str(e)}")
+    return text
+
+
+def cached_stream(generate: Callable[[], Iterable[str]], model: str, prompt: str, system: Optional[str] = None,
+                  temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> Iterator[str]:
+    """Yield a completion as it streams in, caching it once the stream finishes.
+
+    A cached completion is yielded as a single chunk. A stream that is abandoned
+    or fails part-way is not stored.
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        yield from generate()
+        return
+
+    key = llm_cache_key(model, prompt, system, temperature, max_tokens)
+    try:
+        cached = cache.get(key)
+    except sqlite3.Error as e:
+        logger.warning(f"LLM cache read failed: {str(e)}")
+        cached = None
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    for chunk in generate():
+        if chunk:
+            parts.append(chunk)
+            yield chunk
+    text = "".join(parts)
+    if text:
+        try:
+            cache.set(key, text)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {str(e)}")
+
+
+def llm_cache_summary() -> str:
+    """One-line description of the LLM cache counters for display in a sidebar."""
+    cache = get_llm_cache()
+    if cache is None:
+        return "LLM cache: disabled"
+    stats = cache.stats()
+    return (
+        f"LLM cache: {stats['hits']:,} hits · {stats['misses']:,} misses "
+        f"({stats['hit_rate']:.0%} hit rate) · {stats['entries']:,} entries, "
+        f"{stats['size_bytes'] / (1024 * 1024):.1f} MB"
+    )
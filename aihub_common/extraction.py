@@ -0,0 +1,397 @@
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+import zipfile
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional, Union
+from aihub_common.cache import SQLiteCache, cache_dir
+from aihub_common.processes import process_pool
+
+logger = logging.getLogger(__name__)
+
+# A path, raw bytes (or a memoryview), or a binary file-like object such as a Streamlit UploadedFile
+Source = Union[str, os.PathLike, bytes, memoryview, BinaryIO]
+
+PDF_BACKENDS = ("pymupdf", "pypdf2")
+
+PDF_MIME = "application/pdf"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Bytes read when sniffing a file type; a DOCX's "word/" entries usually appear within the first few KB
+SNIFF_BYTES = 8192
+
+# Extracted-text cache defaults; override with the matching environment variables
+DEFAULT_EXTRACTION_CACHE_ENTRIES = 32  # AIHUB_EXTRACTION_CACHE_ENTRIES, documents kept in memory
+DEFAULT_EXTRACTION_CACHE_TTL = 30 * 24 * 60 * 60  # AIHUB_EXTRACTION_CACHE_TTL, seconds on disk
+DEFAULT_EXTRACTION_CACHE_MAX_MB = 512  # AIHUB_EXTRACTION_CACHE_MAX_MB
+
+# Below this many pages, starting worker processes costs more than it saves
+PARALLEL_MIN_PAGES = 64
+
+
+@dataclass
+class PageText:
+    """Text of one page plus where it came from."""
+
+    number: int  # 1-based page number
+    text: str
+    backend: str
+    width: Optional[float] = None  # page size in points, when the backend reports it
+    height: Optional[float] = None
+
+    @property
+    def char_count(self) -> int:
+        return len(self.text)
+
+    @property
+    def word_count(self) -> int:
+        return len(self.text.split())
+
+
+def _import_pymupdf():
+    """Import PyMuPDF under its current name, or the legacy ``fitz`` name before 1.24.3."""
+    try:
+        import pymupdf
+    except ImportError:
+        import fitz as pymupdf
+    return pymupdf
+
+
+def default_pdf_backend() -> str:
+    """PyMuPDF when it is installed (much faster), otherwise PyPDF2."""
+    try:
+        _import_pymupdf()
+        return "pymupdf"
+    except ImportError:
+        return "pypdf2"
+
+
+def _buffer(source: Source):
+    """The document's bytes, without copying them when the source is already in memory.
+
+    In-memory uploads (io.BytesIO, including Streamlit's UploadedFile) are
+    exposed through getbuffer(), a memoryview over the existing data.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read()
+    if hasattr(source, "getbuffer"):
+        return source.getbuffer()
+    source.seek(0)
+    return source.read()
+
+
+def _file_like(source: Source):
+    """A binary file object for libraries that read from streams, positioned at the start."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if isinstance(source, (str, os.PathLike)):
+        return source
+    source.seek(0)
+    return source
+
+
+def sniff_mime(source: Source) -> str:
+    """Guess a document's MIME type from its leading bytes only.
+
+    Recognizes PDF and DOCX; other ZIP archives are reported as application/zip
+    and anything else as application/octet-stream. A ZIP whose first entries are
+    not under word/ (e.g. a large thumbnail first) is checked against its
+    central directory.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+    elif isinstance(source, (bytes, bytearray, memoryview)) or hasattr(source, "getbuffer"):
+        head = bytes(_buffer(source)[:SNIFF_BYTES])
+    else:
+        source.seek(0)
+        head = source.read(SNIFF_BYTES)
+        source.seek(0)
+
+    # The PDF header may be preceded by junk, but must start within the first 1024 bytes
+    if b"%PDF-" in head[:1024]:
+        return PDF_MIME
+    if head.startswith(b"PK\x03\x04"):
+        if b"word/" in head or _zip_has_member(source, "word/document.xml"):
+            return DOCX_MIME
+        return "application/zip"
+    return "application/octet-stream"
+
+
+def _zip_has_member(source: Source, name: str) -> bool:
+    """Whether a ZIP lists name in its central directory (read from the end, not the whole file)."""
+    file = _file_like(source)
+    try:
+        with zipfile.ZipFile(file) as archive:
+            return name in archive.NameToInfo
+    except zipfile.BadZipFile:
+        return False
+    finally:
+        if hasattr(file, "seek"):
+            file.seek(0)
+
+
+def _open_pymupdf(source: Source):
+    pymupdf = _import_pymupdf()
+    if isinstance(source, (str, os.PathLike)):
+        return pymupdf.open(source)
+    return pymupdf.open(stream=_buffer(source), filetype="pdf")
+
+
+def _iter_pymupdf_pages(source: Source, start: int = 0, stop: Optional[int] = None) -> Iterator[PageText]:
+    with _open_pymupdf(source) as doc:
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for index in range(start, stop):
+            page = doc[index]
+            yield PageText(
+                number=index + 1,
+                text=page.get_text("text"),
+                backend="pymupdf",
+                width=page.rect.width,
+                height=page.rect.height,
+            )
+
+
+def _pypdf2_reader(source: Source):
+    import PyPDF2
+
+    return PyPDF2.PdfReader(_file_like(source))
+
+
+def _iter_pypdf2_pages(source: Source, start: int = 0, stop: Optional[int] = None) -> Iterator[PageText]:
+    reader = _pypdf2_reader(source)
+    stop = len(reader.pages) if stop is None else min(stop, len(reader.pages))
+    for index in range(start, stop):
+        page = reader.pages[index]
+        yield PageText(
+            number=index + 1,
+            text=page.extract_text() or "",
+            backend="pypdf2",
+            width=float(page.mediabox.width),
+            height=float(page.mediabox.height),
+        )
+
+
+def iter_pdf_pages(source: Source, backend: Optional[str] = None,
+                   start: int = 0, stop: Optional[int] = None) -> Iterator[PageText]:
+    """Yield the text of a PDF one page at a time.
+
+    Pages are produced as they are parsed, so callers can show progress or stop
+    early without holding the whole document's text. backend is "pymupdf" or
+    "pypdf2"; by default PyMuPDF is used when installed. start and stop select a
+    0-based page range.
+    """
+    backend = backend or default_pdf_backend()
+    if backend == "pymupdf":
+        return _iter_pymupdf_pages(source, start, stop)
+    if backend == "pypdf2":
+        return _iter_pypdf2_pages(source, start, stop)
+    raise ValueError(f"Unknown PDF backend {backend!r}, expected one of {PDF_BACKENDS}")
+
+
+def pdf_page_count(source: Source, backend: Optional[str] = None) -> int:
+    """Number of pages in a PDF."""
+    if (backend or default_pdf_backend()) == "pymupdf":
+        with _open_pymupdf(source) as doc:
+            return doc.page_count
+    return len(_pypdf2_reader(source).pages)
+
+
+def _extract_page_range(source: Source, backend: str, start: int, stop: int) -> List[PageText]:
+    """Worker task: open the document in this process and extract pages [start, stop)."""
+    return list(iter_pdf_pages(source, backend, start, stop))
+
+
+def extract_pdf_pages(source: Source, backend: Optional[str] = None, processes: int = 1,
+                      min_pages: int = PARALLEL_MIN_PAGES) -> List[PageText]:
+    """Extract every page of a PDF, optionally across a process pool.
+
+    With processes > 1 and at least min_pages pages, the document is split into
+    one contiguous page range per process. Each worker opens the document itself
+    and the ranges are reassembled in page order. Smaller documents are extracted
+    in this process, where pool start-up would cost more than it saves. Workers
+    are not forked (see process_pool), so this is safe to call from Streamlit.
+    """
+    backend = backend or default_pdf_backend()
+    if not processes or processes <= 1:
+        return list(iter_pdf_pages(source, backend))
+
+    if not isinstance(source, (str, os.PathLike)):
+        # Workers get a copy of the bytes; buffers and uploads cannot be sent to another process
+        source = bytes(_buffer(source))
+    page_count = pdf_page_count(source, backend)
+    if page_count < min_pages:
+        return list(iter_pdf_pages(source, backend))
+
+    processes = min(processes, page_count)
+    range_size = -(-page_count // processes)  # ceiling division
+    starts = range(0, page_count, range_size)
+    with process_pool(processes) as executor:
+        ranges = executor.map(
+            _extract_page_range,
+            [source] * len(starts),
+            [backend] * len(starts),
+            starts,
+            [start + range_size for start in starts],
+        )
+        return [page for pages in ranges for page in pages]
+
+
+def iter_docx_paragraphs(source: Source) -> Iterator[str]:
+    """Yield the text of each paragraph in a DOCX file."""
+    import docx
+
+    for paragraph in docx.Document(_file_like(source)).paragraphs:
+        yield paragraph.text
+
+
+def extract_pdf_text(source: Source, backend: Optional[str] = None, separator: str = "\n",
+                     processes: int = 1) -> str:
+    """Return the text of every page of a PDF, joined with separator.
+
+    With processes > 1, large documents are extracted in parallel (see extract_pdf_pages).
+    """
+    if processes and processes > 1:
+        pages = extract_pdf_pages(source, backend, processes)
+    else:
+        pages = iter_pdf_pages(source, backend)
+    return separator.join(page.text for page in pages)
+
+
+def extract_docx_text(source: Source) -> str:
+    """Return the text of a DOCX file, one paragraph per line."""
+    return "".join(f"{text}\n" for text in iter_docx_paragraphs(source))
+
+
+def extract_text(source: Source) -> str:
+    """Return the text of a PDF or DOCX file, detected from its leading bytes."""
+    mime = sniff_mime(source)
+    if mime == PDF_MIME:
+        return extract_pdf_text(source)
+    if mime == DOCX_MIME:
+        return extract_docx_text(source)
+    raise ValueError("Unsupported file type. Please upload a PDF or DOCX file.")
+
+
+def document_digest(source: Source) -> str:
+    """SHA-256 of a document's bytes, hashed from the upload buffer without copying it."""
+    return hashlib.sha256(_buffer(source)).hexdigest()
+
+
+class ExtractionCache:
+    """Extracted text keyed by document content hash.
+
+    Recently used documents are kept in an in-memory LRU of max_entries; with a
+    store, entries are also persisted so they survive restarts and are shared
+    between processes. Values must be JSON-serializable.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_EXTRACTION_CACHE_ENTRIES, store: Optional[SQLiteCache] = None):
+        self.max_entries = max_entries
+        self.store = store
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for key, or None."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        if self.store is None:
+            return None
+        try:
+            value = self.store.get(key)
+        except sqlite3.Error as e:
+            logger.warning(f"Extraction cache read failed: {str(e)}")
+            return None
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def set(self, key: str, value: Any):
+        """Store value under key in memory and, if configured, on disk."""
+        self._remember(key, value)
+        if self.store is not None:
+            try:
+                self.store.set(key, value)
+            except sqlite3.Error as e:
+                logger.warning(f"Extraction cache write failed: {str(e)}")
+
+    def _remember(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_extract(self, key: str, extract: Callable[[], Any]) -> Any:
+        """Return the cached value for key, calling extract() on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = extract()
+            self.set(key, value)
+        return value
+
+
+_extraction_cache: Optional[ExtractionCache] = None
+_extraction_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Return the process-wide extraction cache, or None if AIHUB_EXTRACTION_CACHE=0.
+
+    Entries are kept in memory only; set AIHUB_EXTRACTION_CACHE_PERSIST=1 to also
+    persist them to disk. Persisted documents are stored as plaintext.
+    """
+    global _extraction_cache
+    if os.getenv("AIHUB_EXTRACTION_CACHE", "1") == "0":
+        return None
+    with _extraction_cache_lock:
+        if _extraction_cache is None:
+            store = None
+            if os.getenv("AIHUB_EXTRACTION_CACHE_PERSIST", "0") == "1":
+                store = SQLiteCache(
+                    os.path.join(cache_dir(), "extraction_cache.sqlite3"),
+                    max_bytes=int(os.getenv("AIHUB_EXTRACTION_CACHE_MAX_MB", DEFAULT_EXTRACTION_CACHE_MAX_MB)) * 1024 * 1024,
+                    default_ttl=float(os.getenv("AIHUB_EXTRACTION_CACHE_TTL", DEFAULT_EXTRACTION_CACHE_TTL)),
+                )
+            _extraction_cache = ExtractionCache(
+                max_entries=int(os.getenv("AIHUB_EXTRACTION_CACHE_ENTRIES", DEFAULT_EXTRACTION_CACHE_ENTRIES)),
+                store=store,
+            )
+        return _extraction_cache
+
+
+def cached_pdf_pages(source: Source, backend: Optional[str] = None, processes: int = 1) -> List[PageText]:
+    """extract_pdf_pages(), reusing the result for a document with identical bytes."""
+    cache = get_extraction_cache()
+    if cache is None:
+        return extract_pdf_pages(source, backend, processes)
+    backend = backend or default_pdf_backend()
+    pages = cache.get_or_extract(
+        f"pdf:{backend}:{document_digest(source)}",
+        lambda: [asdict(page) for page in extract_pdf_pages(source, backend, processes)],
+    )
+    return [PageText(**page) for page in pages]
+
+
+def cached_pdf_text(source: Source, backend: Optional[str] = None, separator: str = "\n",
+                    processes: int = 1) -> str:
+    """extract_pdf_text(), reusing the pages of a document with identical bytes."""
+    return separator.join(page.text for page in cached_pdf_pages(source, backend, processes))
+
+
+def cached_docx_text(source: Source) -> str:
+    """extract_docx_text(), reusing the result for a document with identical bytes."""
+    cache = get_extraction_cache()
+    if cache is None:
+        return extract_docx_text(source)
+    return cache.get_or_extract(f"docx:{document_digest(source)}", lambda: extract_docx_text(source))
@@ -0,0 +1,155 @@
+"""Import-time report and cold-start budget for the Streamlit apps.
+
+Runs the module-level imports of each app script in a fresh interpreter under
+``python -X importtime`` and compares the total against the budget tracked in
+``startup_budget.json``. Only import statements and ``sys.path`` setup are
+executed, so no Streamlit UI code or API calls run. Work an app does at module
+level beyond importing is not measured: clients built on first run (e.g.
+``get_gemini_model`` or ``get_service(...)`` importing google.generativeai or
+googleapiclient) add to the real cold start on top of the reported time.
+
+Budgets start empty (null) and are set from a measured baseline with
+``--update`` on an environment where the apps' dependencies are installed.
+
+Run from the repository root:
+
+    python -m aihub_common.importtime                      # every app in the budget file
+    python -m aihub_common.importtime pdfchatbot/app.py    # one app, with its heaviest imports
+    python -m aihub_common.importtime --check              # exit 1 if an app is over budget
+    python -m aihub_common.importtime --update             # record measured times as the new budget
+"""
+import argparse
+import ast
+import json
+import math
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+
+# Printed with every report, so the numbers are not mistaken for full cold start
+LIMITATION_NOTE = (
+    "Module-level imports only: service clients an app builds at startup (Gemini, "
+    "YouTube, Anthropic) and their lazy imports are not included."
+)
+
+# Budget written by --update: measured time plus headroom, rounded up to 50ms
+UPDATE_HEADROOM = 1.25
+
+# "import time: self [us] | cumulative | imported package", nested imports indented by two spaces per level
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S.*)$")
+
+
+def import_prelude(script_path: str) -> str:
+    """Source of the script's module-level imports and sys.path setup."""
+    with open(script_path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=script_path)
+
+    def is_sys_path_call(node):
+        return (
+            isinstance(node, ast.Expr)
+            and isinstance(node.value, ast.Call)
+            and isinstance(node.value.func, ast.Attribute)
+            and ast.unparse(node.value.func.value) == "sys.path"
+        )
+
+    body = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)) or is_sys_path_call(node)]
+    return f"__file__ = {os.path.abspath(script_path)!r}\n" + ast.unparse(ast.Module(body=body, type_ignores=[]))
+
+
+def measure(script_path: str) -> Tuple[Optional[float], List[Tuple[str, float]], Optional[str]]:
+    """Import the script's dependencies once in a fresh interpreter.
+
+    Returns (total ms, [(top-level module, cumulative ms)], error). The total is
+    None and error is set if an import failed, e.g. a dependency is missing.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", import_prelude(script_path)],
+        cwd=os.path.dirname(os.path.abspath(script_path)),
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and not match.group(3):
+            modules.append((match.group(4), int(match.group(2)) / 1000))
+    if proc.returncode != 0:
+        error_lines = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        return None, modules, error_lines[-1] if error_lines else f"exit code {proc.returncode}"
+    return sum(ms for _, ms in modules), modules, None
+
+
+def measure_best(script_path: str, runs: int) -> Tuple[Optional[float], List[Tuple[str, float]], Optional[str]]:
+    """Best of several runs, so one-off bytecode compilation does not count against the budget."""
+    best = None
+    for _ in range(runs):
+        result = measure(script_path)
+        if result[2] is not None:
+            return result
+        if best is None or result[0] < best[0]:
+            best = result
+    return best
+
+
+def load_budgets() -> Dict[str, Optional[float]]:
+    """Budget per app in ms; None for an app without a measured baseline yet."""
+    with open(BUDGET_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_budgets(budgets: Dict[str, Optional[float]]):
+    with open(BUDGET_FILE, "w", encoding="utf-8") as f:
+        json.dump(budgets, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time report for the Streamlit apps")
+    parser.add_argument("apps", nargs="*", help="App scripts relative to the repository root (default: all budgeted apps)")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per app; the fastest is reported")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest top-level imports to list per app")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if an app exceeds its budget")
+    parser.add_argument("--update", action="store_true", help="Write measured times plus headroom as the new budgets")
+    args = parser.parse_args(argv)
+
+    budgets = load_budgets()
+    apps = args.apps or sorted(budgets)
+    over_budget = []
+
+    for app in apps:
+        total, modules, error = measure_best(os.path.join(REPO_ROOT, app), args.runs)
+        budget = budgets.get(app)
+        if error:
+            print(f"{app}: import failed ({error})")
+            over_budget.append(app)
+            continue
+
+        status = "no baseline, run --update" if budget is None else ("OK" if total <= budget else "OVER BUDGET")
+        budget_text = "" if budget is None else f" / {budget:,.0f} ms budget"
+        print(f"{app}: {total:,.0f} ms{budget_text} [{status}]")
+        for name, ms in sorted(modules, key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f"    {ms:>9,.1f} ms  {name}")
+
+        if budget is not None and total > budget:
+            over_budget.append(app)
+        if args.update:
+            budgets[app] = math.ceil(total * UPDATE_HEADROOM / 50) * 50
+
+    print(LIMITATION_NOTE)
+    if args.update:
+        save_budgets(budgets)
+        print(f"Budgets written to {os.path.relpath(BUDGET_FILE, REPO_ROOT)}")
+    if args.check and over_budget:
+        print(f"Over budget: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
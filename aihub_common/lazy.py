@@ -0,0 +1,55 @@
+import importlib
+import sys
+import threading
+import types
+
+_import_lock = threading.Lock()
+
+
+class LazyModule(types.ModuleType):
+    """Placeholder that imports the real module on first attribute access.
+
+    Use it for heavy libraries that are only needed on some code paths, e.g.
+    PDF parsing after an upload, so the app script's cold start does not pay
+    for them. Attribute reads and writes are forwarded to the real module.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__["_lazy_target"]
+        if module is None:
+            with _import_lock:
+                module = self.__dict__["_lazy_target"]
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__["_lazy_target"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_lazy_target"] is not None else "not loaded"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Return module name, deferring the import until it is first used.
+
+    Modules that are already imported are returned as-is. Only whole modules can
+    be deferred: replace ``from docx import Document`` with
+    ``docx = lazy_import("docx")`` and call ``docx.Document()``.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
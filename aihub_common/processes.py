@@ -0,0 +1,22 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on: its affinity mask (e.g. a container's CPU set), not every CPU on the host."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def process_pool(max_workers: int, **kwargs) -> ProcessPoolExecutor:
+    """A ProcessPoolExecutor whose workers are not forked from the calling process.
+
+    Streamlit serves each session on its own thread, and forking a multi-threaded
+    process can deadlock on a lock another thread held at the time of the fork.
+    Workers are started by a forkserver where available, else spawned, so they
+    begin from a clean interpreter; task functions and arguments must be picklable.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(method), **kwargs)
@@ -0,0 +1,89 @@
+import heapq
+import math
+import re
+from collections import Counter
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Very common words that carry no retrieval signal
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have how i if in into is it its of on or
+that the their then there these this to was were what when where which who why will
+with you your does do can
+""".split())
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords removed"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def chunk_text(text, chunk_size=200, overlap=40):
+    """Split text into overlapping chunks of roughly chunk_size words"""
+    words = text.split()
+    if not words:
+        return []
+
+    step = max(chunk_size - overlap, 1)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + chunk_size]))
+        if start + chunk_size >= len(words):
+            break
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 index over a list of text passages.
+
+    Built once per document; each query only scores the passages that share
+    at least one term with it.
+    """
+
+    def __init__(self, passages, k1=1.5, b=0.75):
+        self.passages = list(passages)
+        self.k1 = k1
+        self.b = b
+
+        self.term_freqs = []
+        self.lengths = []
+        self.postings = {}
+        for i, passage in enumerate(self.passages):
+            counts = Counter(tokenize(passage))
+            self.term_freqs.append(counts)
+            self.lengths.append(sum(counts.values()))
+            for term in counts:
+                self.postings.setdefault(term, []).append(i)
+
+        total = len(self.passages)
+        self.avg_length = (sum(self.lengths) / total) if total else 0.0
+        self.idf = {
+            term: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def __len__(self):
+        return len(self.passages)
+
+    def scores(self, query):
+        """Return {passage index: score} for passages matching the query"""
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i in self.postings[term]:
+                tf = self.term_freqs[i][term]
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query, top_k=5):
+        """Return the top_k (index, passage) pairs, in document order"""
+        best = heapq.nlargest(top_k, self.scores(query).items(), key=lambda item: item[1])
+        return [(i, self.passages[i]) for i, _ in sorted(best)]
+
+
+def build_index(text, chunk_size=200, overlap=40):
+    """Chunk a document and build a BM25 index over the chunks"""
+    return BM25Index(chunk_text(text, chunk_size, overlap))
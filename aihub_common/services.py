@@ -0,0 +1,105 @@
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Process-wide registry: (service name, API key fingerprint) -> instance.
+# Streamlit re-executes the app script on every widget interaction, so clients
+# built at the top of a script would otherwise be rebuilt on each rerun.
+_services: Dict[Tuple[str, str], Any] = {}
+_services_lock = threading.RLock()
+
+# One lock per registry key, held while that service is built, so a slow build
+# only makes callers of the same service wait
+_build_locks: Dict[Tuple[str, str], threading.RLock] = {}
+
+# google.generativeai keeps its API key in module-global state
+_gemini_configured_key: Optional[str] = None
+
+
+def key_fingerprint(api_key: Optional[str]) -> str:
+    """Short SHA-256 fingerprint of an API key, so raw keys are never used as dict keys."""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def get_service(name: str, api_key: Optional[str], factory: Callable[[Optional[str]], Any]) -> Any:
+    """Return the process-wide instance of a service for this API key.
+
+    factory(api_key) is called the first time a (name, api_key) pair is requested;
+    later calls, including from other Streamlit sessions and reruns, get the same
+    object back. The factory runs outside the registry lock, so building one
+    service never blocks lookups of the others.
+    """
+    registry_key = (name, key_fingerprint(api_key))
+    with _services_lock:
+        service = _services.get(registry_key)
+        if service is not None:
+            return service
+        build_lock = _build_locks.setdefault(registry_key, threading.RLock())
+
+    with build_lock:
+        with _services_lock:
+            service = _services.get(registry_key)
+        if service is None:
+            service = factory(api_key)
+            with _services_lock:
+                service = _services.setdefault(registry_key, service)
+        return service
+
+
+def forget_service(name: str, api_key: Optional[str]):
+    """Drop a registered service, e.g. after its credentials were rejected."""
+    with _services_lock:
+        _services.pop((name, key_fingerprint(api_key)), None)
+
+
+def configure_gemini(api_key: str):
+    """Point google.generativeai at api_key, skipping the call if it already is."""
+    global _gemini_configured_key
+    import google.generativeai as genai
+
+    with _services_lock:
+        if _gemini_configured_key != api_key:
+            genai.configure(api_key=api_key)
+            _gemini_configured_key = api_key
+
+
+def get_gemini_model(api_key: str, model_name: str) -> Any:
+    """Return a shared GenerativeModel handle for model_name.
+
+    The SDK reads its key from global configuration when a request is made, so
+    the key is re-applied whenever a different one was configured in between.
+    """
+    import google.generativeai as genai
+
+    configure_gemini(api_key)
+    return get_service(f"gemini:{model_name}", api_key, lambda key: genai.GenerativeModel(model_name))
+
+
+def list_gemini_models(api_key: str, refresh: bool = False) -> List[str]:
+    """Names of the Gemini models available to api_key.
+
+    This is a network round-trip, so the result is fetched on first use and
+    kept for the process; pass refresh=True to fetch it again. The request runs
+    outside the registry lock, so a slow listing never blocks other services.
+    """
+    import google.generativeai as genai
+
+    registry_key = ("gemini-models", key_fingerprint(api_key))
+    if not refresh:
+        with _services_lock:
+            names = _services.get(registry_key)
+        if names is not None:
+            return list(names)
+
+    configure_gemini(api_key)
+    names = tuple(model.name for model in genai.list_models())
+    with _services_lock:
+        _services[registry_key] = names
+    return list(names)
+
+
+def get_anthropic_client(api_key: str) -> Any:
+    """Return a shared Anthropic client for api_key."""
+    import anthropic
+
+    return get_service("anthropic", api_key, lambda key: anthropic.Client(api_key=key))
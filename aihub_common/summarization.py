@@ -0,0 +1,104 @@
+import math
+import re
+from collections import Counter
+
+from aihub_common.retrieval import tokenize
+
+# Rough size of a token in English text, for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+
+# Sentences shorter than this many terms (after stopwords) are never selected
+MIN_SENTENCE_TERMS = 4
+
+# News and reports front-load the important facts; the first sentences get a
+# bonus that fades with position
+LEAD_BONUS = 0.5
+
+SENTENCE_END = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[\"'(\[]?[A-Z0-9])")
+
+# A period after these ends an abbreviation, not a sentence
+ABBREVIATIONS = frozenset("""
+mr mrs ms dr prof sr jr st mt vs etc inc ltd corp co no fig jan feb mar apr jun jul aug sep sept oct nov dec
+""".split())
+
+
+def estimate_tokens(text):
+    """Approximate token count of text"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def split_sentences(text):
+    """Split text into sentences at terminal punctuation followed by a capital or digit"""
+    sentences = []
+    for block in re.split(r"\n\s*\n|\n(?=\s*[-*•])", text):
+        block = " ".join(block.split())
+        pending = ""
+        for piece in SENTENCE_END.split(block):
+            pending = f"{pending} {piece}" if pending else piece
+            last_word = pending.rsplit(" ", 1)[-1].rstrip(".").lower()
+            if pending.endswith(".") and (last_word in ABBREVIATIONS or len(last_word) == 1 or "." in last_word):
+                continue
+            sentences.append(pending)
+            pending = ""
+        if pending:
+            sentences.append(pending)
+    return sentences
+
+
+def score_sentences(sentences):
+    """TF-IDF centroid score of each sentence.
+
+    Sentences are the documents for IDF; a sentence scores by the cosine
+    similarity of its TF-IDF vector to the whole text's, plus a lead bonus.
+    """
+    term_counts = [Counter(tokenize(sentence)) for sentence in sentences]
+    document_freq = Counter(term for counts in term_counts for term in counts)
+    total = len(sentences)
+    idf = {term: math.log(total / freq) + 1 for term, freq in document_freq.items()}
+
+    centroid = Counter()
+    for counts in term_counts:
+        for term, count in counts.items():
+            centroid[term] += count * idf[term]
+    centroid_norm = math.sqrt(sum(weight * weight for weight in centroid.values())) or 1.0
+
+    scores = []
+    for position, counts in enumerate(term_counts):
+        if sum(counts.values()) < MIN_SENTENCE_TERMS:
+            scores.append(0.0)
+            continue
+        vector = {term: count * idf[term] for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        similarity = sum(weight * centroid[term] for term, weight in vector.items()) / (norm * centroid_norm)
+        scores.append(similarity * (1 + LEAD_BONUS / (position + 1)))
+    return scores
+
+
+def summarize(text, max_tokens=300):
+    """Extractive summary of text within about max_tokens.
+
+    The highest scoring sentences that fit the budget are kept, in their
+    original order. Text already within the budget is returned unchanged.
+    """
+    text = text.strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    sentences = split_sentences(text)
+    scores = score_sentences(sentences)
+
+    budget = max_tokens * CHARS_PER_TOKEN
+    chosen = []
+    used = 0
+    for i in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True):
+        if scores[i] <= 0:
+            break
+        length = len(sentences[i]) + 1
+        if used + length <= budget:
+            chosen.append(i)
+            used += length
+
+    if not chosen:
+        # Not even the best sentence fits: cut it at a word boundary
+        best = max(range(len(sentences)), key=lambda i: scores[i])
+        return sentences[best][:budget].rsplit(" ", 1)[0]
+    return " ".join(sentences[i] for i in sorted(chosen))
@@ -1,13 +1,80 @@
 import streamlit as st
-import anthropic
-import google.generativeai as genai
 import os
-import fitz  # PyMuPDF
+import sys
 import json
-from docx import Document
 from dotenv import load_dotenv
-from fpdf import FPDF
-import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Make the shared aihub_common package importable when run from the project folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aihub_common.cache import cached_completion, llm_cache_summary
+from aihub_common.services import get_anthropic_client, get_gemini_model
+from aihub_common.extraction import cached_pdf_text
+from aihub_common.lazy import lazy_import
+from aihub_common.processes import available_cpus
+
+# Only needed once a summary is exported
+docx = lazy_import("docx")
+
+# Worker processes for extracting large PDFs (small files stay single-process)
+PDF_EXTRACTION_PROCESSES = available_cpus()
+
+# Models used for parsing and field extraction
+CLAUDE_MODEL = "claude-3-5-haiku-20241022"
+GEMINI_MODEL = "gemini-1.5-pro"
+
+# Default concurrency and per-provider request limits (requests per minute)
+DEFAULT_MAX_CONCURRENT_REQUESTS = 5
+DEFAULT_RATE_LIMITS = {"claude": 50, "gemini": 60}
+
+# Fields to extract from the protocol, in the order they appear in the summary
+FIELD_DEFINITIONS = {
+    "STUDY TITLE": "Provide full title of the study",
+    "CLINICAL PHASE": "Specify clinical phase (1, 2a)",
+    "STUDY OBJECTIVES": "Provide a brief description of the study objectives, including primary, secondary, and exploratory objectives.",
+    "STUDY RATIONALE": "Summarize the rationale for testing the proposed therapy.",
+    "STUDY POPULATION": "Briefly describe the study population and explain the rationale for choosing this population.",
+    "MAIN INCLUSION/EXCLUSION CRITERIA": "Specify the main inclusion/exclusion criteria and explain the rationale.",
+    "PRIMARY ENDPOINT(S)": "Describe the Primary Endpoint(s) and the set of measurements used to address the objectives.",
+    "SECONDARY & EXPLORATORY ENDPOINTS": "Describe the Secondary & Exploratory Endpoint(s) and measures that will address them.",
+    "STUDY DESIGN": "Summarize the study design, including type of study, number of arms, controls or comparators.",
+    "SUBJECT NUMBER": "Provide the total number of study subjects, the number per study arm, and justification.",
+    "TREATMENT DURATION": "Specify the length of the treatment period.",
+    "DURATION OF FOLLOW UP": "Specify the length of the protocol-specified follow-up period.",
+    "DOSE LEVEL(S) AND DOSE JUSTIFICATION": "Specify the dose level(s), number of doses, and dosing frequency. Summarize how dosing was determined.",
+    "ROUTE OF DELIVERY": "Specify how the doses will be delivered.",
+    "DATA and SAFETY MONITORING PLAN": "Summarize the Data and Safety Monitoring Plan.",
+    "STOPPING RULES": "Specify stopping rules.",
+    "IMMUNE MONITORING & IMMUNOSUPPRESSION": "Describe and justify the plan for immunosuppression and immune monitoring (if applicable).",
+    "SUPPORTING STUDIES": "Summarize supporting studies that are part of this clinical study.",
+    "ASSAYS/METHODOLOGIES": "Briefly describe any specialized assays or methodologies that will be used in this clinical study.",
+    "STATISTICAL ANALYSIS PLAN": "Summarize the Statistical Analysis Plan or describe how the data will be analyzed.",
+    "OUTCOME CRITERIA": "Describe criteria that would define whether you would or would not move forward with the subsequent development plan.",
+    "RISKS": "Identify potential risks and mitigation strategies.",
+    "CLINICAL SITES": "Indicate the number of clinical sites that will participate in the study.",
+    "CLINICAL OPERATIONS PLAN": "Summarize the plan for managing the conduct of the clinical study.",
+    "ENROLLMENT": "Describe the enrollment strategy and provide a timeline showing enrollment projections. Describe plans for inclusion of women and minorities.",
+    "LONG TERM FOLLOW UP": "Describe requirements and plans for long term follow up and indicate how these will be supported.",
+    "TIMELINE": "Provide a timeline for completion of the study and indicate relevant milestones."
+}
+
+# Related fields extracted together in one request when batching is enabled
+FIELD_GROUPS = [
+    ["STUDY TITLE", "CLINICAL PHASE", "STUDY OBJECTIVES", "STUDY RATIONALE"],
+    ["STUDY POPULATION", "MAIN INCLUSION/EXCLUSION CRITERIA", "SUBJECT NUMBER", "ENROLLMENT"],
+    ["PRIMARY ENDPOINT(S)", "SECONDARY & EXPLORATORY ENDPOINTS", "OUTCOME CRITERIA", "STATISTICAL ANALYSIS PLAN"],
+    ["STUDY DESIGN", "DOSE LEVEL(S) AND DOSE JUSTIFICATION", "ROUTE OF DELIVERY", "IMMUNE MONITORING & IMMUNOSUPPRESSION"],
+    ["TREATMENT DURATION", "DURATION OF FOLLOW UP", "LONG TERM FOLLOW UP", "TIMELINE"],
+    ["DATA and SAFETY MONITORING PLAN", "STOPPING RULES", "RISKS"],
+    ["CLINICAL SITES", "CLINICAL OPERATIONS PLAN", "SUPPORTING STUDIES", "ASSAYS/METHODOLOGIES"]
+]
+
+# Output token allowance per field in a batched request, and the model's output cap
+BATCH_TOKENS_PER_FIELD = 1000
+MAX_OUTPUT_TOKENS = 8192
 
 # Load API keys from environment variables or secrets
 def get_api_keys():
@@ -21,41 +88,81 @@ def get_api_keys():
         gemini_key = os.getenv("GEMINI_API_KEY", "")
     return anthropic_key, gemini_key
 
+# Rate limiting shared by all worker threads
+class RateLimiter:
+    """Thread-safe sliding-window limiter allowing at most max_calls per period seconds"""
+
+    def __init__(self, max_calls, period=60.0):
+        self.max_calls = max_calls
+        self.period = period
+        self.calls = deque()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until another call is allowed under the limit"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.calls and now - self.calls[0] >= self.period:
+                    self.calls.popleft()
+                if len(self.calls) < self.max_calls:
+                    self.calls.append(now)
+                    return
+                wait = self.period - (now - self.calls[0])
+            time.sleep(wait)
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider, requests_per_minute=None):
+    """Get the process-wide rate limiter for a provider, resizing it if the limit changed"""
+    limit = requests_per_minute or DEFAULT_RATE_LIMITS[provider]
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(provider)
+        if limiter is None:
+            limiter = _rate_limiters[provider] = RateLimiter(limit)
+        limiter.max_calls = limit
+        return limiter
+
+# Cached, rate-limited model calls
+def claude_completion(claude_client, prompt, system, max_tokens, temperature=0.1):
+    """Call Claude, reusing the cached response for identical requests"""
+    def generate():
+        get_rate_limiter("claude").acquire()
+        response = claude_client.messages.create(
+            model=CLAUDE_MODEL,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system=system,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return response.content[0].text
+    return cached_completion(generate, CLAUDE_MODEL, prompt, system, temperature, max_tokens)
+
+def gemini_completion(gemini_client, prompt):
+    """Call Gemini, reusing the cached response for identical requests"""
+    def generate():
+        get_rate_limiter("gemini").acquire()
+        return gemini_client.generate_content(prompt).text
+    return cached_completion(generate, GEMINI_MODEL, prompt)
+
 # Initialize AI clients
 def initialize_clients(anthropic_key, gemini_key):
     """Initialize both Anthropic and Gemini clients"""
     try:
-        anthropic_client = anthropic.Client(api_key=anthropic_key) if anthropic_key else None
-        if gemini_key:
-            genai.configure(api_key=gemini_key)
-            gemini_client = genai.GenerativeModel("gemini-1.5-pro")
-        else:
-            gemini_client = None
+        # Clients are shared per API key across reruns and sessions
+        anthropic_client = get_anthropic_client(anthropic_key) if anthropic_key else None
+        gemini_client = get_gemini_model(gemini_key, GEMINI_MODEL) if gemini_key else None
         return anthropic_client, gemini_client
     except Exception as e:
         st.error(f"Error initializing clients: {str(e)}")
         return None, None
 
-# Extract text from PDF using PyMuPDF
+# Extract text from PDF (PyMuPDF, falling back to PyPDF2), page ranges in parallel for large files
 def extract_text_from_pdf(uploaded_file):
     """Extract text from an uploaded PDF file"""
-    text = ""
     try:
-        # Create a temporary file to store the uploaded content
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            # Write the uploaded file content to the temporary file
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_file.flush()
-            
-            # Open the temporary file with PyMuPDF
-            with fitz.open(tmp_file.name) as doc:
-                for page in doc:
-                    text += page.get_text("text") + "\n"
-            
-            # Delete the temporary file
-            os.unlink(tmp_file.name)
-            
-        return text.strip()
+        return cached_pdf_text(uploaded_file, processes=PDF_EXTRACTION_PROCESSES).strip()
     except Exception as e:
         st.error(f"Error extracting text from PDF: {str(e)}")
         return ""
@@ -71,8 +178,7 @@ def parse_document_with_gemini(text, gemini_client):
     {text}
     """
     try:
-        response = gemini_client.generate_content(prompt)
-        return response.text, None
+        return gemini_completion(gemini_client, prompt), None
     except Exception as e:
         return None, str(e)
 
@@ -87,14 +193,13 @@ def parse_document_with_claude(text, claude_client):
     {text}
     """
     try:
-        response = claude_client.messages.create(
-            model="claude-3-5-haiku-20241022",
-            max_tokens=4000,
-            temperature=0.1,
+        content = claude_completion(
+            claude_client,
+            prompt,
             system="You are a clinical protocol analyst. Extract and structure the complete document content.",
-            messages=[{"role": "user", "content": prompt}]
+            max_tokens=4000
         )
-        return response.content[0].text.strip(), None
+        return content.strip(), None
     except Exception as e:
         return None, str(e)
 
@@ -146,22 +251,130 @@ def extract_field_with_claude(parsed_content, field_title, field_description, an
     """
     
     try:
-        response = anthropic_client.messages.create(
-            model="claude-3-5-haiku-20241022",
-            max_tokens=1000,
-            temperature=0.1,
+        content = claude_completion(
+            anthropic_client,
+            prompt,
             system="You are a clinical protocol analyst. Extract and format relevant information for the specified field.",
-            messages=[{"role": "user", "content": prompt}]
+            max_tokens=1000
+        ).strip()
+        return (content if content else "No relevant information found for this field."), None
+    except Exception as e:
+        return f"Error processing {field_title}: {str(e)}", str(e)
+
+# Parse a JSON object out of a model response
+def parse_json_object(text):
+    """Parse the outermost JSON object in text, tolerating code fences and surrounding prose"""
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        parsed = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+# Use Claude to extract a group of related fields in one structured request
+def extract_field_group_with_claude(parsed_content, fields, anthropic_client):
+    """Extract several fields at once; returns ({field_title: content}, error).
+
+    Fields missing or empty in the response are left out of the result so the
+    caller can fall back to per-field extraction for them.
+    """
+    field_list = "\n".join(f"- {field_title}: {field_desc}" for field_title, field_desc in fields.items())
+    prompt = f"""
+    You are analyzing a clinical study protocol. For each field listed below, extract and summarize the most relevant information from the parsed document.
+    
+    Fields (title: expected content):
+    {field_list}
+    
+    Guidelines:
+    1. Focus specifically on content relevant to each field
+    2. Provide comprehensive but concise information
+    3. Maintain professional medical terminology
+    4. Include all relevant details and context
+    5. Format each value in clear, readable paragraphs
+    6. If no relevant information exists for a field, say so in its value
+    
+    Respond with a single JSON object whose keys are exactly the field titles above and whose values are the extracted text. Do not include anything outside the JSON object.
+    
+    Parsed Document Content:
+    {parsed_content}
+    """
+    
+    try:
+        response_text = claude_completion(
+            anthropic_client,
+            prompt,
+            system="You are a clinical protocol analyst. Extract and format relevant information for the specified fields as JSON.",
+            max_tokens=min(BATCH_TOKENS_PER_FIELD * len(fields), MAX_OUTPUT_TOKENS)
         )
-        content = response.content[0].text.strip()
-        return content if content else "No relevant information found for this field."
+        parsed = parse_json_object(response_text)
+        if parsed is None:
+            return {}, "Response was not valid JSON"
+        return {
+            field_title: str(parsed[field_title]).strip()
+            for field_title in fields
+            if parsed.get(field_title) and str(parsed[field_title]).strip()
+        }, None
     except Exception as e:
-        st.error(f"Error extracting field with Claude: {str(e)}")
-        return f"Error processing {field_title}: {str(e)}"
+        return {}, str(e)
+
+# Extract all fields concurrently with a bounded thread pool
+def extract_fields_concurrently(parsed_content, field_definitions, anthropic_client,
+                                max_workers=DEFAULT_MAX_CONCURRENT_REQUESTS, on_field_done=None,
+                                field_groups=None):
+    """Extract every field in parallel and return results in field_definitions order.
+
+    With field_groups, each group is first requested as one batched call and any
+    field missing from its response is re-queued on the per-field path. Worker
+    threads only talk to the API; on_field_done(field_title, content, error) is
+    called from the calling thread as each field completes, so it may update
+    Streamlit elements.
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit_field(field_title):
+            future = executor.submit(
+                extract_field_with_claude, parsed_content, field_title, field_definitions[field_title], anthropic_client
+            )
+            pending[future] = ("field", field_title)
+        
+        pending = {}
+        grouped = set()
+        for group in field_groups or []:
+            fields = {field_title: field_definitions[field_title] for field_title in group if field_title in field_definitions}
+            if len(fields) > 1:
+                future = executor.submit(extract_field_group_with_claude, parsed_content, fields, anthropic_client)
+                pending[future] = ("group", fields)
+                grouped.update(fields)
+        for field_title in field_definitions:
+            if field_title not in grouped:
+                submit_field(field_title)
+        
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, target = pending.pop(future)
+                if kind == "group":
+                    contents, _ = future.result()
+                    for field_title in target:
+                        if field_title in contents:
+                            results[field_title] = contents[field_title]
+                            if on_field_done:
+                                on_field_done(field_title, contents[field_title], None)
+                        else:
+                            submit_field(field_title)
+                else:
+                    content, error = future.result()
+                    results[target] = content
+                    if on_field_done:
+                        on_field_done(target, content, error)
+    return {field_title: results[field_title] for field_title in field_definitions}
 
 # Generate DOCX summary
 def generate_docx_summary(extracted_fields, output_path="summary.docx"):
-    doc = Document()
+    doc = docx.Document()
     doc.add_heading("Clinical Study Summary", level=1)
     
     for field_title, content in extracted_fields.items():
@@ -224,6 +437,29 @@ def main():
             if gemini_client:
                 available_services.append("Gemini")
             st.success(f"✅ Available services: {', '.join(available_services)}")
+        st.caption(llm_cache_summary())
+        
+        # Extraction performance settings
+        st.subheader("Performance")
+        max_concurrent_requests = st.slider(
+            "Concurrent requests",
+            min_value=1,
+            max_value=20,
+            value=DEFAULT_MAX_CONCURRENT_REQUESTS,
+            help="Number of fields extracted in parallel"
+        )
+        claude_rpm = st.number_input(
+            "Claude requests per minute",
+            min_value=1,
+            value=DEFAULT_RATE_LIMITS["claude"],
+            help="Keep this at or below your Anthropic rate limit"
+        )
+        get_rate_limiter("claude", claude_rpm)
+        batch_fields = st.checkbox(
+            "Batch related fields",
+            value=True,
+            help="Extract groups of related fields in one request, falling back to one request per field for anything missing"
+        )
         
         # File uploader
         uploaded_file = st.file_uploader("Upload Clinical Protocol PDF", type=["pdf"])
@@ -242,48 +478,28 @@ def main():
                 st.error("❌ Could not parse document with any available service")
                 st.stop()
             
-            # Define fields to extract
-            field_definitions = {
-                "STUDY TITLE": "Provide full title of the study",
-                "CLINICAL PHASE": "Specify clinical phase (1, 2a)",
-                "STUDY OBJECTIVES": "Provide a brief description of the study objectives, including primary, secondary, and exploratory objectives.",
-                "STUDY RATIONALE": "Summarize the rationale for testing the proposed therapy.",
-                "STUDY POPULATION": "Briefly describe the study population and explain the rationale for choosing this population.",
-                "MAIN INCLUSION/EXCLUSION CRITERIA": "Specify the main inclusion/exclusion criteria and explain the rationale.",
-                "PRIMARY ENDPOINT(S)": "Describe the Primary Endpoint(s) and the set of measurements used to address the objectives.",
-                "SECONDARY & EXPLORATORY ENDPOINTS": "Describe the Secondary & Exploratory Endpoint(s) and measures that will address them.",
-                "STUDY DESIGN": "Summarize the study design, including type of study, number of arms, controls or comparators.",
-                "SUBJECT NUMBER": "Provide the total number of study subjects, the number per study arm, and justification.",
-                "TREATMENT DURATION": "Specify the length of the treatment period.",
-                "DURATION OF FOLLOW UP": "Specify the length of the protocol-specified follow-up period.",
-                "DOSE LEVEL(S) AND DOSE JUSTIFICATION": "Specify the dose level(s), number of doses, and dosing frequency. Summarize how dosing was determined.",
-                "ROUTE OF DELIVERY": "Specify how the doses will be delivered.",
-                "DATA and SAFETY MONITORING PLAN": "Summarize the Data and Safety Monitoring Plan.",
-                "STOPPING RULES": "Specify stopping rules.",
-                "IMMUNE MONITORING & IMMUNOSUPPRESSION": "Describe and justify the plan for immunosuppression and immune monitoring (if applicable).",
-                "SUPPORTING STUDIES": "Summarize supporting studies that are part of this clinical study.",
-                "ASSAYS/METHODOLOGIES": "Briefly describe any specialized assays or methodologies that will be used in this clinical study.",
-                "STATISTICAL ANALYSIS PLAN": "Summarize the Statistical Analysis Plan or describe how the data will be analyzed.",
-                "OUTCOME CRITERIA": "Describe criteria that would define whether you would or would not move forward with the subsequent development plan.",
-                "RISKS": "Identify potential risks and mitigation strategies.",
-                "CLINICAL SITES": "Indicate the number of clinical sites that will participate in the study.",
-                "CLINICAL OPERATIONS PLAN": "Summarize the plan for managing the conduct of the clinical study.",
-                "ENROLLMENT": "Describe the enrollment strategy and provide a timeline showing enrollment projections. Describe plans for inclusion of women and minorities.",
-                "LONG TERM FOLLOW UP": "Describe requirements and plans for long term follow up and indicate how these will be supported.",
-                "TIMELINE": "Provide a timeline for completion of the study and indicate relevant milestones."
-            }
-            
-            # Extract fields with progress tracking
-            extracted_fields = {}
+            # Extract fields with progress tracking as they complete
             progress_bar = st.progress(0)
-            total_fields = len(field_definitions)
+            status_text = st.empty()
+            total_fields = len(FIELD_DEFINITIONS)
+            completed = []
+            
+            def on_field_done(field_title, content, error):
+                completed.append(field_title)
+                if error:
+                    st.error(f"Error extracting {field_title} with Claude: {error}")
+                status_text.text(f"📝 Analyzed {field_title} ({len(completed)}/{total_fields})")
+                progress_bar.progress(len(completed) / total_fields)
             
-            for i, (field_title, field_desc) in enumerate(field_definitions.items()):
-                with st.spinner(f"📝 Analyzing {field_title}..."):
-                    extracted_fields[field_title] = extract_field_with_claude(
-                        parsed_content, field_title, field_desc, anthropic_client
-                    )
-                progress_bar.progress((i + 1) / total_fields)
+            extracted_fields = extract_fields_concurrently(
+                parsed_content,
+                FIELD_DEFINITIONS,
+                anthropic_client,
+                max_workers=max_concurrent_requests,
+                on_field_done=on_field_done,
+                field_groups=FIELD_GROUPS if batch_fields else None
+            )
+            status_text.empty()
             
             st.success("✅ Document processed successfully!")
             
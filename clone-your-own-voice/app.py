@@ -1,16 +1,19 @@
 import streamlit as st
 import os
+import sys
 from dotenv import load_dotenv
-from elevenlabs import client
-import google.generativeai as genai
-from docx import Document
-import PyPDF2
-import tempfile
-import magic
 import io
 from audio_recorder_streamlit import audio_recorder
 import wave
-import numpy as np
+
+# Make the shared aihub_common package importable when run from the project folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aihub_common.services import get_gemini_model
+from aihub_common.extraction import extract_text
+from aihub_common.lazy import lazy_import
+
+# Only needed once a document or voice sample is submitted
+client = lazy_import("elevenlabs.client")
 
 # Load environment variables
 load_dotenv()
@@ -23,65 +26,32 @@ if not ELEVENLABS_API_KEY or not GEMINI_API_KEY:
     st.error("Please set up your API keys in the .env file")
     st.stop()
 
-# Configure Gemini
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel('gemini-2.0-flash')
-
-# Configure ElevenLabs
-client.api_key = ELEVENLABS_API_KEY
-
-# Function to extract text from PDF
-def extract_text_from_pdf(pdf_file):
-    try:
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-        return text
-    except Exception as e:
-        st.error(f"Error reading PDF file: {str(e)}")
-        return None
-
-# Function to extract text from DOCX
-def extract_text_from_docx(docx_file):
-    try:
-        doc = Document(docx_file)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
-    except Exception as e:
-        st.error(f"Error reading DOCX file: {str(e)}")
-        return None
+# Configure Gemini (model handle shared across reruns and sessions)
+model = get_gemini_model(GEMINI_API_KEY, 'gemini-2.0-flash')
 
 # Function to process document and extract text
 def process_document(file):
     try:
-        # Get file type
-        file_bytes = file.read()
-        file_type = magic.from_buffer(file_bytes, mime=True)
-        file.seek(0)  # Reset file pointer
-        
-        if file_type == 'application/pdf':
-            return extract_text_from_pdf(file)
-        elif file_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
-            return extract_text_from_docx(file)
-        else:
-            raise ValueError("Unsupported file type. Please upload a PDF or DOCX file.")
+        # File type is detected from the leading bytes of the in-memory upload
+        return extract_text(file)
     except Exception as e:
         st.error(f"Error processing document: {str(e)}")
         return None
 
-# Function to save recorded audio bytes as a WAV file
-def save_audio_bytes(audio_bytes, filename):
-    """Save audio bytes to a WAV file"""
+# Function to wrap recorded audio bytes as an in-memory WAV file
+def save_audio_bytes(audio_bytes):
+    """Return the recorded audio as a WAV file object held in memory"""
     try:
-        with wave.open(filename, 'wb') as wav_file:
+        wav_buffer = io.BytesIO()
+        with wave.open(wav_buffer, 'wb') as wav_file:
             wav_file.setnchannels(1)  # Mono
             wav_file.setsampwidth(2)  # 2 bytes per sample
             wav_file.setframerate(44100)  # 44.1kHz
             wav_file.writeframes(audio_bytes)
-        return filename
+        wav_buffer.seek(0)
+        # Uploaded as multipart form data, where the filename carries the format
+        wav_buffer.name = "voice_sample.wav"
+        return wav_buffer
     except Exception as e:
         st.error(f"Error saving audio file: {str(e)}")
         return None
@@ -112,10 +82,8 @@ def main():
         
         if audio_bytes:
             st.audio(audio_bytes, format="audio/wav")
-            # Save recorded audio to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
-                if save_audio_bytes(audio_bytes, tmp_file.name):
-                    voice_sample = open(tmp_file.name, 'rb')
+            # Keep the recorded audio in memory
+            voice_sample = save_audio_bytes(audio_bytes)
     
     # Document upload
     document = st.file_uploader("Upload Document (PDF or DOCX)", type=['pdf', 'docx'])
@@ -133,11 +101,14 @@ def main():
             with st.spinner("Cloning your voice..."):
                 voice_bytes = voice_sample.read()
                 voice_sample.seek(0)  # Reset the file pointer
+                voice_mime = "audio/mpeg" if voice_sample.name.lower().endswith(".mp3") else "audio/wav"
                 
+                # Configure ElevenLabs (imported on first use)
+                client.api_key = ELEVENLABS_API_KEY
                 cloned_voice = client.clone(
                     name="Custom Voice",
                     description="Custom cloned voice",
-                    files=[voice_bytes]
+                    files=[(voice_sample.name, voice_bytes, voice_mime)]
                 )
             
             # Generate speech
@@ -148,10 +119,9 @@ def main():
                     model_id="eleven_monolingual_v1"
                 )
             
-            # Save audio to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as tmp_file:
-                tmp_file.write(audio)
-                tmp_file_path = tmp_file.name
+            # The SDK may return the audio as a stream of chunks
+            if not isinstance(audio, bytes):
+                audio = b"".join(audio)
             
             # Create columns for audio player and download button
             col1, col2 = st.columns(2)
@@ -159,21 +129,17 @@ def main():
             # Play audio
             with col1:
                 st.subheader("Listen to Generated Audio")
-                st.audio(tmp_file_path)
+                st.audio(audio, format="audio/mp3")
             
             # Download button
             with col2:
                 st.subheader("Download Audio")
-                with open(tmp_file_path, 'rb') as f:
-                    st.download_button(
-                        label="Download MP3",
-                        data=f,
-                        file_name="generated_speech.mp3",
-                        mime="audio/mp3"
-                    )
-            
-            # Clean up
-            os.unlink(tmp_file_path)
+                st.download_button(
+                    label="Download MP3",
+                    data=audio,
+                    file_name="generated_speech.mp3",
+                    mime="audio/mp3"
+                )
             
         except Exception as e:
             st.error(f"An error occurred: {str(e)}")
@@ -183,14 +149,6 @@ def main():
                 st.warning("There might be an issue with your API key. Please verify it's correct.")
             elif "voice" in str(e).lower():
                 st.warning("There might be an issue with the voice sample. Please try recording again or upload a different sample.")
-        finally:
-            # Clean up temporary files
-            if voice_input_method == "Record Voice" and voice_sample:
-                voice_sample.close()
-                try:
-                    os.unlink(voice_sample.name)
-                except:
-                    pass
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,16 @@
 import os
+import sys
+
+# Make the shared aihub_common package importable when run from the project folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from newsletter_generator import NewsletterGenerator
 from email_sender import EmailSender
+from send_queue import SendQueue
 import streamlit as st
 from dotenv import load_dotenv
+from aihub_common.cache import llm_cache_summary
+from aihub_common.services import get_service
 
 # Load environment variables
 load_dotenv()
@@ -94,6 +102,7 @@ with st.sidebar:
     st.info(f"SMTP Port: {active_config['SMTP_PORT']}")
     st.info(f"Sender Email: {active_config['SENDER_EMAIL']}")
     st.info(f"Email Password: {'*' * 20 if active_config['SENDER_PASSWORD'] else 'Not set'}")
+    st.caption(llm_cache_summary())
 
 # Validate configuration
 if not st.session_state.config['GEMINI_API_KEY']:
@@ -116,16 +125,25 @@ email_sender = EmailSender(
     sender_password=st.session_state.config['SENDER_PASSWORD']
 )
 
+# Durable record of every newsletter delivery, shared by all sessions
+send_queue = get_service("send_queue", None, lambda _: SendQueue())
+
 # Main content area
 st.title("📰 AI Newsletter Generator")
 st.markdown("### Welcome to the Newsletter Generator!")
 
-# Initialize the NewsletterGenerator
-@st.cache_resource(show_spinner=True)
-def get_generator():
-    return NewsletterGenerator(api_key=st.session_state.config['GEMINI_API_KEY'])
+# Initialize the NewsletterGenerator (one per process and API key, so a key
+# entered in the sidebar takes effect without restarting the app)
+generator = get_service("newsletter", st.session_state.config['GEMINI_API_KEY'], NewsletterGenerator)
 
-generator = get_generator()
+# Model discovery is an API round-trip, so it only runs when asked for
+with st.sidebar:
+    with st.expander("Available Gemini models"):
+        if st.button("List models"):
+            try:
+                st.write(generator.list_available_models())
+            except Exception as e:
+                st.error(f"Could not list models: {str(e)}")
 
 # Create tabs for different sections
 tab1, tab2 = st.tabs(["Generate Newsletter", "Email Configuration"])
@@ -136,6 +154,10 @@ with tab1:
     with col1:
         topic = st.text_input("Enter Topic", help="Enter the main topic for your newsletter")
         description = st.text_area("Additional Details (optional)", height=100, help="Add any specific details or focus areas you want to include")
+        read_articles = st.checkbox(
+            "Read full articles",
+            help="Download the top news articles and give the model a short summary of each instead of just the search snippet (slower)"
+        )
 
     with col2:
         st.markdown("### Tips")
@@ -152,7 +174,7 @@ with tab1:
     if st.button("Generate Newsletter", type="primary"):
         if topic.strip():
             with st.spinner("Generating Newsletter..."):
-                newsletter_content = generator.generate_newsletter(topic, description)
+                newsletter_content = generator.generate_newsletter(topic, description, read_articles)
                 if newsletter_content:
                     st.session_state.newsletter_content = newsletter_content
                     st.markdown("## Generated Newsletter")
@@ -202,16 +224,46 @@ with tab2:
             if invalid_emails:
                 st.error(f"Invalid email addresses found: {', '.join(invalid_emails)}")
             else:
-                with st.spinner("Sending newsletter..."):
-                    success, message = email_sender.send_newsletter(
+                with st.spinner("Queueing newsletter..."):
+                    success, message, campaign_id = email_sender.queue_newsletter(
                         recipient_emails=recipient_emails,
                         subject=email_subject,
-                        content=st.session_state.newsletter_content
+                        content=st.session_state.newsletter_content,
+                        send_queue=send_queue
                     )
-                    if success:
-                        st.success(message)
-                    else:
-                        st.error(message)
+                if success:
+                    st.session_state.campaign_id = campaign_id
+                    # One drainer per campaign, SMTP account and process; starting it again
+                    # while it runs is a no-op, and changed credentials get a new drainer
+                    st.session_state.drainer = get_service(
+                        f"campaign:{campaign_id}",
+                        email_sender.account,
+                        lambda _: email_sender.queue_drainer(send_queue, campaign_id)
+                    ).start()
+                    st.success(message)
+                else:
+                    st.error(message)
+
+    if st.session_state.get('campaign_id'):
+        campaign_id = st.session_state.campaign_id
+        counts = send_queue.counts(campaign_id)
+        total = sum(counts.values())
+        st.markdown("### Delivery Status")
+        st.progress((counts['sent'] + counts['failed']) / total if total else 0.0)
+        st.write(
+            f"Sent {counts['sent']:,} of {total:,} · "
+            f"pending {counts['pending'] + counts['sending']:,} · failed {counts['failed']:,}"
+        )
+        drainer = st.session_state.get('drainer')
+        if drainer is not None and drainer.error:
+            st.error(f"Delivery stopped: {drainer.error}. Check the SMTP settings and send again to resume.")
+        for recipient, error in send_queue.failures(campaign_id):
+            st.caption(f"❌ {recipient}: {error}")
+        st.button("Refresh status")
+        st.caption(
+            f"Delivery continues in the background and failed sends are retried with backoff. "
+            f"If the app stops, resume with `python send_queue.py resume --campaign {campaign_id}`."
+        )
 
 # Footer
 st.markdown("---")
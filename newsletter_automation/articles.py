@@ -0,0 +1,101 @@
+import logging
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
+from aihub_common.summarization import summarize
+from news_search import CONNECT_TIMEOUT, READ_TIMEOUT, bs4, get_session, html_parser
+
+logger = logging.getLogger(__name__)
+
+# Articles fetched per newsletter, and the size each one is compressed to
+ARTICLE_TOP_N = 5
+ARTICLE_TOKEN_BUDGET = 250
+
+# Pages are read up to this size; the rest (comments, footers) is rarely article text
+MAX_ARTICLE_BYTES = 2 * 1024 * 1024
+
+# Paragraphs shorter than this are usually captions, bylines or buttons
+MIN_PARAGRAPH_WORDS = 8
+
+# Below this, an <article>/<main> element is probably a teaser, not the story
+MIN_ARTICLE_WORDS = 80
+
+# charset parameter of a Content-Type header
+CHARSET = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE)
+
+BOILERPLATE_TAGS = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form", "figure", "iframe", "svg"]
+
+def _paragraphs(element) -> List[str]:
+    texts = (p.get_text(" ", strip=True) for p in element.find_all('p'))
+    return [text for text in texts if len(text.split()) >= MIN_PARAGRAPH_WORDS]
+
+def extract_main_text(html: Union[str, bytes], encoding: Optional[str] = None) -> str:
+    """The main text of an article page.
+
+    Uses the page's <article> or <main> element when it holds enough prose,
+    otherwise the element whose direct paragraphs hold the most text. Raw bytes
+    are decoded with encoding if given, else the page's <meta> charset or a
+    guess from the content.
+    """
+    soup = bs4.BeautifulSoup(html, html_parser(), from_encoding=encoding if isinstance(html, bytes) else None)
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+
+    for container in soup.find_all(['article', 'main']):
+        paragraphs = _paragraphs(container)
+        if sum(len(paragraph.split()) for paragraph in paragraphs) >= MIN_ARTICLE_WORDS:
+            return "\n\n".join(paragraphs)
+
+    by_parent = defaultdict(list)
+    for p in soup.find_all('p'):
+        text = p.get_text(" ", strip=True)
+        if len(text.split()) >= MIN_PARAGRAPH_WORDS:
+            by_parent[id(p.parent)].append(text)
+    if not by_parent:
+        return ""
+    return "\n\n".join(max(by_parent.values(), key=lambda texts: sum(map(len, texts))))
+
+def fetch_article(url: str, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)) -> Optional[str]:
+    """Download an article page and return its main text, or None if it is unavailable"""
+    try:
+        with get_session().get(url, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', 'text/html')
+            if 'html' not in content_type:
+                return None
+            body = b""
+            for chunk in response.iter_content(64 * 1024):
+                body += chunk
+                if len(body) >= MAX_ARTICLE_BYTES:
+                    break
+            # Only trust a charset the server declared; requests assumes ISO-8859-1
+            # for text/html without one, which garbles UTF-8 pages
+            charset = CHARSET.search(content_type)
+        return extract_main_text(body, charset.group(1) if charset else None) or None
+    except Exception as e:
+        logger.warning(f"Could not fetch article {url}: {str(e)}")
+        return None
+
+def add_article_summaries(results: List[Dict[str, str]], top_n: int = ARTICLE_TOP_N,
+                          max_tokens: int = ARTICLE_TOKEN_BUDGET) -> List[Dict[str, str]]:
+    """Fetch the top_n results' pages concurrently and add a 'summary' of each.
+
+    Each article is compressed to about max_tokens with a local extractive
+    summarizer, so the prompt grows by at most top_n * max_tokens. Results whose
+    page cannot be fetched keep only their search snippet.
+    """
+    def summarize_result(result):
+        text = fetch_article(result['url'])
+        if text:
+            return {**result, 'summary': summarize(text, max_tokens)}
+        return result
+
+    selected = [result for result in results[:top_n] if result.get('url')]
+    if not selected:
+        return results
+    with ThreadPoolExecutor(max_workers=len(selected)) as executor:
+        summarized = {id(result): enriched for result, enriched in zip(selected, executor.map(summarize_result, selected))}
+    enriched = [summarized.get(id(result), result) for result in results]
+    logger.info(f"Summarized {sum('summary' in result for result in enriched)} of {len(selected)} articles")
+    return enriched
@@ -0,0 +1,99 @@
+"""Benchmark newsletter delivery against a local aiosmtpd server (pip install aiosmtpd).
+
+    python bench_bulk_send.py                          # 500 recipients, 20 ms per message
+    python bench_bulk_send.py --recipients 2000 --latency 0.05 --connections 8
+    python bench_bulk_send.py --fail-every 50          # server rejects every 50th message with 421
+
+--latency is how long the server takes to accept each message, standing in
+for a remote provider. The first row opens a new SMTP connection per message
+(what per-recipient messages cost with the old send path). The others send
+the same per-recipient messages through BulkSender's connection pool. Every
+recipient must be delivered exactly once, including after injected failures.
+"""
+import argparse
+import asyncio
+import os
+import smtplib
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+
+from aiosmtpd.controller import Controller
+
+# Make the shared aihub_common package importable when run from the project folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bulk_sender import BulkSender, SMTPSettings
+from email_sender import EmailSender
+
+class CountingHandler:
+    """Accepts messages after a delay, counting deliveries per recipient"""
+
+    def __init__(self, latency, fail_every):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.received = Counter()
+        self.attempts = 0
+        self.lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.latency)
+        with self.lock:
+            self.attempts += 1
+            if self.fail_every and self.attempts % self.fail_every == 0:
+                return '421 Service temporarily unavailable'
+            for recipient in envelope.rcpt_tos:
+                self.received[recipient] += 1
+        return '250 OK'
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def connection_per_message(sender, settings, recipients, html):
+    for recipient in recipients:
+        with smtplib.SMTP(settings.host, settings.port) as server:
+            server.send_message(sender.build_message(recipient, "Benchmark", html), to_addrs=[recipient])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recipients', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.02, help="Seconds the server takes per message")
+    parser.add_argument('--connections', type=int, default=4)
+    parser.add_argument('--fail-every', type=int, default=0, help="Reply 421 to every Nth message")
+    args = parser.parse_args()
+
+    handler = CountingHandler(args.latency, args.fail_every)
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    settings = SMTPSettings(controller.hostname, controller.port)
+    sender = EmailSender(settings.host, settings.port, "newsletter@example.com", "")
+    html = sender.render_html("Benchmark", "<p>" + "Newsletter body text. " * 200 + "</p>")
+    recipients = [f"subscriber{i}@example.com" for i in range(args.recipients)]
+
+    print(f"{args.recipients} recipients, {args.latency * 1000:.0f} ms server latency per message")
+    print(f"{'mode':<28} {'seconds':>9} {'msg/s':>9} {'connects':>9} {'20k recipients':>15}")
+
+    def report(mode, seconds, connects):
+        rate = args.recipients / seconds
+        print(f"{mode:<28} {seconds:>9.2f} {rate:>9.1f} {connects:>9} {20000 / rate / 60:>13.1f}m")
+
+    if not args.fail_every:
+        start = time.perf_counter()
+        connection_per_message(sender, settings, recipients, html)
+        report("connection per message", time.perf_counter() - start, args.recipients)
+
+    for connections in sorted({1, args.connections}):
+        handler.received.clear()
+        bulk = BulkSender(settings, connections=connections)
+        result = bulk.send_all((recipient, sender.build_message(recipient, "Benchmark", html)) for recipient in recipients)
+        bulk.close()
+        assert not result.failed, result.failed
+        assert all(handler.received[recipient] == 1 for recipient in recipients)
+        report(f"pool of {connections}", result.elapsed, bulk.pool.connects)
+    controller.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark news search against a local fixture server with simulated latency.
+
+    python bench_news_search.py                # 300 ms per search
+    python bench_news_search.py --latency 0.8
+
+The server answers DuckDuckGo-style HTML result pages, sleeping --latency
+seconds per request, so no network access is needed. The legacy column is the
+old single-query search_news (one requests.get per search, no session); the
+sequential column fetches the same query variants one after another; the next
+runs them concurrently over the pooled session. The last column adds the full
+article stage: the top results' pages are fetched concurrently and summarized.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+import requests
+
+# Make the shared aihub_common package importable when run from the project folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import news_search
+import articles
+from aihub_common.summarization import estimate_tokens
+
+RESULTS_PER_PAGE = 10
+
+def fixture_page(query, base_url):
+    """A results page whose links depend on the query, overlapping between queries"""
+    words = query.split()
+    results = []
+    for rank in range(RESULTS_PER_PAGE):
+        # Even ranks are shared by every query, so merged results need deduping
+        slug = f"story-{rank}" if rank % 2 == 0 else f"{words[-1]}-{rank}"
+        href = f"//duckduckgo.com/l/?uddg={quote(f'{base_url}/article/{slug}', safe='')}"
+        results.append(f"""
+        <div class="result results_links web-result">
+          <h2 class="result__title"><a class="result__a" href="{href}">{query} headline {rank}</a></h2>
+          <a class="result__snippet" href="{href}">Snippet for {slug} about {query}.</a>
+        </div>""")
+    return f"<html><body><div id='links'>{''.join(results)}</div></body></html>"
+
+def article_page(slug):
+    """A news article with navigation, a long story and a footer"""
+    sentences = [
+        f"Researchers behind {slug} reported a new milestone in quantum error correction this week.",
+        "The team said logical qubits now outlive their physical counterparts by a wide margin.",
+        "Investors have poured record funding into startups building fault-tolerant machines.",
+        "Critics caution that useful applications remain years away despite the progress.",
+        "Several companies announced roadmaps targeting thousands of logical qubits by the end of the decade.",
+    ]
+    paragraphs = "".join(f"<p>{' '.join(sentences[i:] + sentences[:i])}</p>" for i in range(len(sentences)) for _ in range(4))
+    return (f"<html><body><nav><p>Home World Business Technology Science Opinion Sports Weather</p></nav>"
+            f"<article><h1>{slug}</h1>{paragraphs}</article>"
+            f"<footer><p>Copyright News Example. All rights reserved. Terms of use and privacy policy apply.</p></footer></body></html>")
+
+def start_fixture_server(latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            time.sleep(latency)
+            if url.path.startswith("/article/"):
+                body = article_page(url.path.rsplit("/", 1)[1]).encode()
+            else:
+                query = parse_qs(url.query).get('q', [''])[0]
+                base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+                body = fixture_page(query, base_url).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def legacy_search(search_url, topic):
+    """NewsletterGenerator.search_news before the shared session and query variants"""
+    response = requests.get(f"{search_url}?q={topic}+news", headers={'User-Agent': news_search.USER_AGENT})
+    soup = news_search.bs4.BeautifulSoup(response.text, 'html.parser')
+    results = []
+    for result in soup.find_all('div', {'class': 'result'})[:5]:
+        title = result.find('h2').get_text() if result.find('h2') else ""
+        snippet = result.find('a', {'class': 'result__snippet'}).get_text() if result.find('a', {'class': 'result__snippet'}) else ""
+        if title and snippet:
+            results.append({'title': title, 'snippet': snippet})
+    return results
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.3, help="Seconds the fixture server waits per request")
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    server = start_fixture_server(args.latency)
+    search_url = f"http://127.0.0.1:{server.server_address[1]}/html/"
+    topic = "quantum computing"
+    description = "Focus on error correction, startups and funding"
+    queries = news_search.query_variants(topic, description)
+
+    print(f"{len(queries)} query variants, {args.latency * 1000:.0f} ms server latency")
+    print(f"{'run':>4} {'legacy':>10} {'sequential':>12} {'concurrent':>12} {'+ articles':>12} {'legacy results':>16} {'merged results':>16}")
+    for run in range(1, args.runs + 1):
+        legacy_time, legacy_results = timed(legacy_search, search_url, topic)
+        sequential_time, _ = timed(lambda: [news_search.fetch_results(query, search_url) for query in queries])
+        concurrent_time, results = timed(news_search.search_news, topic, description, search_url=search_url)
+        articles_time, enriched = timed(articles.add_article_summaries, results)
+        assert len({result['url'] for result in results}) == len(results)
+        print(f"{run:>4} {legacy_time:>9.3f}s {sequential_time:>11.3f}s {concurrent_time:>11.3f}s "
+              f"{concurrent_time + articles_time:>11.3f}s {len(legacy_results):>16} {len(results):>16}")
+
+    page_tokens = estimate_tokens(articles.extract_main_text(article_page("story-0")))
+    context = "\n".join(news_search.format_result(result) for result in enriched)
+    print(f"\nArticle text: ~{page_tokens} tokens each, summarized to <= {articles.ARTICLE_TOKEN_BUDGET}; "
+          f"news context with {articles.ARTICLE_TOP_N} summaries: ~{estimate_tokens(context)} tokens")
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
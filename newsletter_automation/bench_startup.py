@@ -0,0 +1,72 @@
+"""Benchmark the newsletter app's startup: imports and NewsletterGenerator construction.
+
+    python bench_startup.py              # construction only (no API requests)
+    GEMINI_API_KEY=... python bench_startup.py --runs 5
+
+Each run is a fresh interpreter, like a cold Streamlit start. With
+GEMINI_API_KEY set, the legacy column adds the genai.list_models() round-trip
+that construction used to make, and the model listing is timed on first
+(network) and second (cached) use.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CHILD = r"""
+import json, os, sys, time
+sys.path[:0] = [{here!r}, os.path.dirname({here!r})]
+timings = {{}}
+start = time.perf_counter()
+from newsletter_generator import NewsletterGenerator
+timings['import'] = time.perf_counter() - start
+
+api_key = os.getenv('GEMINI_API_KEY') or 'benchmark-placeholder-key'
+start = time.perf_counter()
+generator = NewsletterGenerator(api_key)
+timings['construct'] = time.perf_counter() - start
+
+if os.getenv('GEMINI_API_KEY'):
+    start = time.perf_counter()
+    generator.list_available_models()
+    timings['list_models'] = time.perf_counter() - start
+    start = time.perf_counter()
+    generator.list_available_models()
+    timings['list_models_cached'] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+def run_once():
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD.format(here=HERE)],
+        capture_output=True, text=True, cwd=HERE
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "child failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    with_api = bool(os.getenv('GEMINI_API_KEY'))
+    columns = ["import", "construct", "startup"]
+    if with_api:
+        columns += ["legacy startup", "list (first)", "list (cached)"]
+    print(f"{'run':>4} " + " ".join(f"{name:>15}" for name in columns))
+    for run in range(1, args.runs + 1):
+        timings = run_once()
+        startup = timings['import'] + timings['construct']
+        values = [timings['import'], timings['construct'], startup]
+        if with_api:
+            values += [startup + timings['list_models'], timings['list_models'], timings['list_models_cached']]
+        print(f"{run:>4} " + " ".join(f"{seconds * 1000:>13.1f}ms" for seconds in values))
+    if not with_api:
+        print("\nSet GEMINI_API_KEY to also time the list_models round-trip that construction used to make.")
+
+if __name__ == '__main__':
+    main()
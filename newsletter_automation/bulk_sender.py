@@ -0,0 +1,350 @@
+import logging
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from dataclasses import dataclass, field
+from email.message import Message
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Providers commonly cap messages per SMTP session; reconnect before hitting it
+MAX_MESSAGES_PER_CONNECTION = 100
+
+# Idle connections older than this are checked with NOOP before reuse
+MAX_IDLE_SECONDS = 30
+
+# Replies that refuse the account rather than the recipient (authentication
+# required, credentials invalid, app password required, encryption required)
+ACCOUNT_REFUSAL_CODES = frozenset({530, 534, 535, 538})
+
+# Attempts per message after a transient failure (dropped connection, 4xx reply)
+SEND_RETRIES = 2
+RETRY_DELAY = 1.0
+
+@dataclass(frozen=True)
+class SMTPSettings:
+    """How to reach and authenticate with an SMTP server.
+
+    use_ssl defaults to implicit TLS on port 465. starttls=None upgrades the
+    connection when the server offers STARTTLS; True requires it, False never
+    uses it. Login happens only when a password is set and the server offers AUTH.
+    """
+    host: str
+    port: int
+    username: str = ""
+    password: str = field(default="", repr=False)
+    use_ssl: Optional[bool] = None
+    starttls: Optional[bool] = None
+    timeout: float = 30
+
+class DeliveryError(Exception):
+    """A message could not be delivered to a recipient.
+
+    permanent is True when the server rejected it (5xx), so retrying is pointless.
+    """
+
+    def __init__(self, recipient: str, reason: str, permanent: bool):
+        super().__init__(f"{recipient}: {reason}")
+        self.recipient = recipient
+        self.reason = reason
+        self.permanent = permanent
+
+class ConnectionFailed(Exception):
+    """The SMTP server could not be reached or rejected the account (login, TLS).
+
+    Every other message would fail the same way, so this stops a whole batch
+    instead of counting as a failed delivery to one recipient.
+    """
+
+class SMTPConnection:
+    """One SMTP session, opened on demand and counting the messages sent over it"""
+
+    def __init__(self, settings: SMTPSettings):
+        self.settings = settings
+        self.smtp = None
+        self.sent = 0
+        self.last_used = 0.0
+
+    def open(self):
+        settings = self.settings
+        use_ssl = settings.port == 465 if settings.use_ssl is None else settings.use_ssl
+        if use_ssl:
+            smtp = smtplib.SMTP_SSL(settings.host, settings.port, timeout=settings.timeout,
+                                    context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(settings.host, settings.port, timeout=settings.timeout)
+        try:
+            smtp.ehlo()
+            if not use_ssl and (settings.starttls or (settings.starttls is None and smtp.has_extn('starttls'))):
+                smtp.starttls(context=ssl.create_default_context())
+                smtp.ehlo()
+            if settings.password:
+                if not smtp.has_extn('auth'):
+                    # Sending unauthenticated would only get every message refused
+                    raise ConnectionFailed(f"{settings.host}:{settings.port}: server does not offer AUTH "
+                                           "(check the port and STARTTLS settings)")
+                smtp.login(settings.username, settings.password)
+        except Exception:
+            smtp.close()
+            raise
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+    def is_alive(self) -> bool:
+        try:
+            return self.smtp is not None and self.smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def send(self, message: Message, recipient: str):
+        self.smtp.send_message(message, to_addrs=[recipient])
+        self.sent += 1
+        self.last_used = time.monotonic()
+
+    def close(self):
+        if self.smtp is None:
+            return
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+        self.smtp = None
+
+class SMTPConnectionPool:
+    """A bounded pool of long-lived SMTP connections shared by sending threads.
+
+    Connections are opened lazily, up to size, and reused until they have sent
+    max_messages_per_connection messages. Connections idle for a while are
+    checked with NOOP before reuse, and reopened if the server dropped them.
+    """
+
+    def __init__(self, settings: SMTPSettings, size: int = 4,
+                 max_messages_per_connection: int = MAX_MESSAGES_PER_CONNECTION,
+                 max_idle_seconds: float = MAX_IDLE_SECONDS):
+        self.settings = settings
+        self.size = size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_idle_seconds = max_idle_seconds
+        self.connects = 0
+        self._idle = []
+        self._checked_out = 0
+        self._available = threading.Condition()
+
+    def acquire(self) -> SMTPConnection:
+        """Take a connection, opening one if the pool is not full, else waiting for one"""
+        with self._available:
+            while not self._idle and self._checked_out + len(self._idle) >= self.size:
+                self._available.wait()
+            connection = self._idle.pop() if self._idle else SMTPConnection(self.settings)
+            self._checked_out += 1
+        try:
+            if connection.smtp is not None and time.monotonic() - connection.last_used > self.max_idle_seconds:
+                if not connection.is_alive():
+                    connection.close()
+            if connection.smtp is None:
+                connection.open()
+                self.connects += 1
+        except Exception:
+            self.discard(connection)
+            raise
+        return connection
+
+    def release(self, connection: SMTPConnection):
+        """Return a healthy connection, closing it once it reached its message limit"""
+        if connection.sent >= self.max_messages_per_connection:
+            connection.close()
+        with self._available:
+            self._checked_out -= 1
+            self._idle.append(connection)
+            self._available.notify()
+
+    def discard(self, connection: SMTPConnection):
+        """Drop a connection after an error; a new one is opened when needed"""
+        connection.close()
+        with self._available:
+            self._checked_out -= 1
+            self._available.notify()
+
+    def close(self):
+        with self._available:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+class RateLimiter:
+    """Spaces calls evenly to at most rate_per_second across all threads (None: unlimited)"""
+
+    def __init__(self, rate_per_second: Optional[float] = None):
+        self.interval = 1 / rate_per_second if rate_per_second else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+@dataclass
+class DeliveryReport:
+    sent: int = 0
+    failed: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+    # Why sending stopped before every message was tried (see ConnectionFailed)
+    aborted: Optional[str] = None
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+class BulkSender:
+    """Delivers one message per recipient over a pool of SMTP connections.
+
+    connections is both the pool size and the number of sending threads.
+    rate_per_second throttles the total send rate to the provider's limit.
+    """
+
+    def __init__(self, settings: SMTPSettings, connections: int = 4,
+                 max_messages_per_connection: int = MAX_MESSAGES_PER_CONNECTION,
+                 rate_per_second: Optional[float] = None, retries: int = SEND_RETRIES):
+        self.connections = connections
+        self.pool = SMTPConnectionPool(settings, connections, max_messages_per_connection)
+        self.rate_limiter = RateLimiter(rate_per_second)
+        self.retries = retries
+
+    def send_message(self, recipient: str, message: Message):
+        """Send one message, reconnecting and retrying after transient failures.
+
+        Raises DeliveryError when the server rejects the recipient or message or
+        retries run out, and ConnectionFailed when the server stays unreachable
+        or refuses the account (login, TLS, sender), which would fail every message.
+        """
+        settings = self.pool.settings
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.wait()
+            connected = False
+            try:
+                connection = self.pool.acquire()
+            except (smtplib.SMTPAuthenticationError, smtplib.SMTPNotSupportedError, ssl.SSLError) as e:
+                # Wrong credentials or TLS setup: retrying cannot help
+                raise ConnectionFailed(f"{settings.host}:{settings.port}: {str(e)}") from e
+            except (smtplib.SMTPException, OSError) as e:
+                error = e
+            else:
+                connected = True
+                try:
+                    connection.send(message, recipient)
+                except smtplib.SMTPRecipientsRefused as e:
+                    self.pool.release(connection)
+                    code, reply = e.recipients.get(recipient, (550, b"refused"))
+                    reason = f"{code} {reply.decode(errors='replace')}"
+                    if code in ACCOUNT_REFUSAL_CODES:
+                        raise ConnectionFailed(f"{settings.host}:{settings.port}: {reason}") from e
+                    if code >= 500:
+                        raise DeliveryError(recipient, reason, True)
+                    # 4xx, e.g. greylisting: the mailbox may accept it later
+                    error = reason
+                except smtplib.SMTPResponseException as e:
+                    reason = f"{e.smtp_code} {e.smtp_error.decode(errors='replace')}"
+                    if (isinstance(e, (smtplib.SMTPSenderRefused, smtplib.SMTPAuthenticationError))
+                            or e.smtp_code in ACCOUNT_REFUSAL_CODES):
+                        self.pool.discard(connection)
+                        raise ConnectionFailed(f"{settings.host}:{settings.port}: {reason}") from e
+                    if isinstance(e, smtplib.SMTPDataError) and e.smtp_code >= 500:
+                        # The message itself was rejected
+                        self.pool.release(connection)
+                        raise DeliveryError(recipient, reason, True)
+                    self.pool.discard(connection)
+                    error = e
+                except (smtplib.SMTPException, OSError) as e:
+                    self.pool.discard(connection)
+                    error = e
+                else:
+                    self.pool.release(connection)
+                    return
+            logger.warning(f"Send to {recipient} failed (attempt {attempt + 1}): {str(error)}")
+            if attempt < self.retries:
+                time.sleep(RETRY_DELAY * (attempt + 1))
+        if not connected:
+            raise ConnectionFailed(f"{settings.host}:{settings.port}: {str(error)}") from error
+        raise DeliveryError(recipient, str(error), False)
+
+    def send_all(self, messages: Iterable[Tuple[str, Message]],
+                 on_result: Optional[Callable[[str, Optional[str]], None]] = None) -> DeliveryReport:
+        """Send (recipient, message) pairs concurrently and report what was delivered.
+
+        Messages are pulled from the iterable as threads free up, so they can be
+        built lazily. on_result(recipient, error) is called after each message,
+        with error None on success. If the server cannot be reached or rejects
+        the login, the remaining messages are skipped and report.aborted says why.
+        """
+        report = DeliveryReport()
+        report_lock = threading.Lock()
+        pending = queue.Queue(maxsize=self.connections * 4)
+        done = object()
+        abort = threading.Event()
+
+        def worker():
+            while True:
+                item = pending.get()
+                if item is done:
+                    return
+                if abort.is_set():
+                    continue
+                recipient, message = item
+                try:
+                    self.send_message(recipient, message)
+                    error = None
+                except ConnectionFailed as e:
+                    with report_lock:
+                        report.aborted = report.aborted or str(e)
+                    abort.set()
+                    continue
+                except DeliveryError as e:
+                    error = e.reason
+                except Exception as e:
+                    # Keep the worker alive: if every worker died, the producer would block forever
+                    logger.exception(f"Unexpected error sending to {recipient}")
+                    error = f"{type(e).__name__}: {str(e)}"
+                with report_lock:
+                    if error is None:
+                        report.sent += 1
+                    else:
+                        report.failed[recipient] = error
+                if on_result:
+                    try:
+                        on_result(recipient, error)
+                    except Exception:
+                        logger.exception(f"on_result callback failed for {recipient}")
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.connections)]
+        for thread in threads:
+            thread.start()
+        try:
+            for item in messages:
+                if abort.is_set():
+                    break
+                pending.put(item)
+        finally:
+            for _ in threads:
+                pending.put(done)
+            for thread in threads:
+                thread.join()
+        report.elapsed = time.perf_counter() - start
+        if report.aborted:
+            logger.error(f"Sending stopped after {report.sent} messages: {report.aborted}")
+        logger.info(f"Delivered {report.sent} messages ({len(report.failed)} failed) in {report.elapsed:.1f}s "
+                    f"over {self.pool.connects} SMTP connections")
+        return report
+
+    def close(self):
+        self.pool.close()
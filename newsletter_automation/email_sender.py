@@ -1,14 +1,31 @@
-import smtplib
 import re
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
-from typing import List
+from email.utils import make_msgid, formatdate
+from typing import Callable, List, Optional
 import logging
 import os
+from aihub_common.services import get_service
+from bulk_sender import BulkSender, SMTPSettings
+from send_queue import QueueDrainer, SendQueue
 
 logger = logging.getLogger(__name__)
 
+LOGO_PATH = 'slickbit_technologies_logo.jpeg'
+
+# Delivery tuning; keep SMTP_RATE_LIMIT (messages per second) within your provider's limits
+SMTP_CONNECTIONS = int(os.getenv('SMTP_CONNECTIONS', '4'))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', '100'))
+SMTP_RATE_LIMIT = float(os.getenv('SMTP_RATE_LIMIT', '0')) or None
+
+def load_logo() -> Optional[bytes]:
+    """The logo embedded in every newsletter, if the file exists."""
+    if not os.path.exists(LOGO_PATH):
+        return None
+    with open(LOGO_PATH, 'rb') as f:
+        return f.read()
+
 class EmailSender:
     def __init__(self, smtp_server: str, smtp_port: int, sender_email: str, sender_password: str):
         """Initialize email sender with SMTP configuration."""
@@ -32,111 +49,191 @@ class EmailSender:
                 invalid_emails.append(email)
         return invalid_emails
 
-    def send_newsletter(self, recipient_emails: List[str], subject: str, content: str) -> tuple[bool, str]:
-        """Send newsletter to multiple recipients."""
+    @property
+    def account(self) -> str:
+        """Everything that identifies the SMTP login, for keying per-account services"""
+        return f"{self.smtp_server}:{self.smtp_port}:{self.sender_email}:{self.sender_password}"
+
+    def get_bulk_sender(self) -> BulkSender:
+        """The process-wide bulk sender for this SMTP account, so its connections outlive Streamlit reruns."""
+        return get_service("smtp", self.account, lambda _: BulkSender(
+            SMTPSettings(self.smtp_server, self.smtp_port, self.sender_email, self.sender_password),
+            connections=SMTP_CONNECTIONS,
+            max_messages_per_connection=SMTP_MAX_MESSAGES_PER_CONNECTION,
+            rate_per_second=SMTP_RATE_LIMIT
+        ))
+
+    def render_html(self, subject: str, content: str) -> str:
+        """Wrap newsletter content in the HTML email template."""
+        return f"""
+        <html>
+            <head>
+                <style>
+                    body {{
+                        font-family: Arial, sans-serif;
+                        line-height: 1.6;
+                        color: #333;
+                        max-width: 800px;
+                        margin: 0 auto;
+                        padding: 20px;
+                    }}
+                    .header {{
+                        text-align: center;
+                        margin-bottom: 30px;
+                        padding: 20px;
+                        background-color: #f8f9fa;
+                        border-radius: 5px;
+                    }}
+                    .logo {{
+                        max-width: 200px;
+                        margin-bottom: 20px;
+                    }}
+                    .content {{
+                        background-color: white;
+                        padding: 20px;
+                        border-radius: 5px;
+                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                    }}
+                    h1 {{
+                        color: #2c3e50;
+                        border-bottom: 2px solid #eee;
+                        padding-bottom: 10px;
+                    }}
+                    h2 {{
+                        color: #34495e;
+                        margin-top: 25px;
+                    }}
+                    p {{
+                        margin-bottom: 15px;
+                    }}
+                    .footer {{
+                        margin-top: 30px;
+                        padding-top: 20px;
+                        border-top: 1px solid #eee;
+                        text-align: center;
+                        color: #666;
+                        font-size: 0.9em;
+                    }}
+                </style>
+            </head>
+            <body>
+                <div class="header">
+                    <img src="cid:logo" alt="Slickbit Technologies Logo" class="logo">
+                    <h1>{subject}</h1>
+                </div>
+                <div class="content">
+                    {content}
+                </div>
+                <div class="footer">
+                    <p>Generated by AI Newsletter Generator</p>
+                    <p>© {os.getenv('SENDER_EMAIL')}</p>
+                </div>
+            </body>
+        </html>
+        """
+
+    def build_message(self, recipient: str, subject: str, html_content: str, logo: Optional[bytes] = None,
+                      message_id: Optional[str] = None) -> MIMEMultipart:
+        """Build the message for one recipient, addressed to them alone."""
+        msg = MIMEMultipart('related')
+        msg['From'] = self.sender_email
+        msg['To'] = recipient
+        msg['Subject'] = subject
+        msg['Date'] = formatdate(localtime=True)
+        msg['Message-ID'] = message_id or make_msgid()
+
+        # Create the HTML part
+        html_part = MIMEMultipart('alternative')
+        msg.attach(html_part)
+        html_part.attach(MIMEText(html_content, 'html'))
+
+        if logo:
+            logo_part = MIMEImage(logo)
+            logo_part.add_header('Content-ID', '<logo>')
+            msg.attach(logo_part)
+        return msg
+
+    def send_newsletter(self, recipient_emails: List[str], subject: str, content: str,
+                        personalize: Optional[Callable[[str, str], str]] = None) -> tuple[bool, str]:
+        """Send newsletter to multiple recipients, one message each.
+
+        The template is rendered once; personalize(recipient, html), if given,
+        adapts it per recipient. Messages are built as the connection pool is
+        ready for them.
+        """
         try:
             # Validate emails first
             invalid_emails = self.validate_emails(recipient_emails)
             if invalid_emails:
                 return False, f"Invalid email addresses: {', '.join(invalid_emails)}"
 
-            # Create message
-            msg = MIMEMultipart('related')
-            msg['From'] = self.sender_email
-            msg['To'] = ', '.join(recipient_emails)
-            msg['Subject'] = subject
-
-            # Create the HTML part
-            html_part = MIMEMultipart('alternative')
-            msg.attach(html_part)
-
-            # Add logo
-            logo_path = 'slickbit_technologies_logo.jpeg'
-            if os.path.exists(logo_path):
-                with open(logo_path, 'rb') as f:
-                    logo = MIMEImage(f.read())
-                    logo.add_header('Content-ID', '<logo>')
-                    msg.attach(logo)
-
-            # Create HTML content with modern styling
-            html_content = f"""
-            <html>
-                <head>
-                    <style>
-                        body {{
-                            font-family: Arial, sans-serif;
-                            line-height: 1.6;
-                            color: #333;
-                            max-width: 800px;
-                            margin: 0 auto;
-                            padding: 20px;
-                        }}
-                        .header {{
-                            text-align: center;
-                            margin-bottom: 30px;
-                            padding: 20px;
-                            background-color: #f8f9fa;
-                            border-radius: 5px;
-                        }}
-                        .logo {{
-                            max-width: 200px;
-                            margin-bottom: 20px;
-                        }}
-                        .content {{
-                            background-color: white;
-                            padding: 20px;
-                            border-radius: 5px;
-                            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                        }}
-                        h1 {{
-                            color: #2c3e50;
-                            border-bottom: 2px solid #eee;
-                            padding-bottom: 10px;
-                        }}
-                        h2 {{
-                            color: #34495e;
-                            margin-top: 25px;
-                        }}
-                        p {{
-                            margin-bottom: 15px;
-                        }}
-                        .footer {{
-                            margin-top: 30px;
-                            padding-top: 20px;
-                            border-top: 1px solid #eee;
-                            text-align: center;
-                            color: #666;
-                            font-size: 0.9em;
-                        }}
-                    </style>
-                </head>
-                <body>
-                    <div class="header">
-                        <img src="cid:logo" alt="Slickbit Technologies Logo" class="logo">
-                        <h1>{subject}</h1>
-                    </div>
-                    <div class="content">
-                        {content}
-                    </div>
-                    <div class="footer">
-                        <p>Generated by AI Newsletter Generator</p>
-                        <p>© {os.getenv('SENDER_EMAIL')}</p>
-                    </div>
-                </body>
-            </html>
-            """
-            html_part.attach(MIMEText(html_content, 'html'))
-
-            # Connect to SMTP server and send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(msg)
-
-            logger.info(f"Newsletter sent successfully to {len(recipient_emails)} recipients")
-            return True, "Newsletter sent successfully!"
+            html_content = self.render_html(subject, content)
+            logo = load_logo()
+
+            messages = (
+                (recipient, self.build_message(
+                    recipient, subject, personalize(recipient, html_content) if personalize else html_content, logo
+                ))
+                for recipient in (email.strip() for email in recipient_emails)
+            )
+            report = self.get_bulk_sender().send_all(messages)
+
+            if report.aborted:
+                error_msg = f"Sending stopped after {report.sent} of {len(recipient_emails)} recipients: {report.aborted}"
+                logger.error(error_msg)
+                return False, error_msg
+
+            if report.failed:
+                failures = ', '.join(f"{recipient} ({reason})" for recipient, reason in report.failed.items())
+                error_msg = f"Sent to {report.sent} of {len(recipient_emails)} recipients. Failed: {failures}"
+                logger.error(error_msg)
+                return False, error_msg
+
+            logger.info(f"Newsletter sent successfully to {report.sent} recipients")
+            return True, f"Newsletter sent successfully to {report.sent} recipients!"
 
         except Exception as e:
             error_msg = f"Failed to send newsletter: {str(e)}"
             logger.error(error_msg)
-            return False, error_msg 
\ No newline at end of file
+            return False, error_msg
+
+    def queue_newsletter(self, recipient_emails: List[str], subject: str, content: str,
+                         send_queue: SendQueue) -> tuple[bool, str, Optional[str]]:
+        """Record a newsletter and its recipients in the durable send queue.
+
+        Returns (success, message, campaign id); deliver it with queue_drainer.
+        Queueing the same newsletter again adds new recipients and re-queues
+        the deliveries that failed; recipients already sent to are skipped.
+        """
+        invalid_emails = self.validate_emails(recipient_emails)
+        if invalid_emails:
+            return False, f"Invalid email addresses: {', '.join(invalid_emails)}", None
+        try:
+            campaign_id = send_queue.add_campaign(
+                self.sender_email, subject, self.render_html(subject, content), recipient_emails
+            )
+            retried = send_queue.retry_failed(campaign_id)
+        except Exception as e:
+            error_msg = f"Failed to queue newsletter: {str(e)}"
+            logger.error(error_msg)
+            return False, error_msg, None
+        logger.info(f"Queued newsletter {campaign_id} for {len(recipient_emails)} recipients ({retried} failed re-queued)")
+        message = f"Newsletter queued for {len(recipient_emails)} recipients"
+        if retried:
+            message += f", retrying {retried} failed deliveries"
+        return True, message, campaign_id
+
+    def queue_drainer(self, send_queue: SendQueue, campaign_id: Optional[str] = None) -> QueueDrainer:
+        """Background workers delivering queued messages through this account's connection pool.
+
+        Each message carries a Message-ID derived from its delivery key, so a
+        retried delivery is recognisably the same email.
+        """
+        logo = load_logo()
+        domain = self.sender_email.rpartition('@')[2] or 'localhost'
+
+        def build(campaign, delivery):
+            return self.build_message(delivery.recipient, campaign.subject, campaign.html, logo,
+                                      message_id=f"<{delivery.key}@{domain}>")
+
+        return QueueDrainer(send_queue, self.get_bulk_sender(), build, campaign_id=campaign_id)
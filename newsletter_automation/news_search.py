@@ -0,0 +1,163 @@
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from aihub_common.lazy import lazy_import
+
+# Only needed once results are parsed
+bs4 = lazy_import("bs4")
+
+logger = logging.getLogger(__name__)
+
+# DuckDuckGo's HTML endpoint (no API key required); override to point at a
+# mirror or a local fixture server
+NEWS_SEARCH_URL = os.getenv("NEWS_SEARCH_URL", "https://html.duckduckgo.com/html/")
+
+# Seconds to wait for a connection and then for the response
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 8
+
+# Connections kept open per host; queries beyond this wait for a free one
+POOL_SIZE = 10
+
+RESULTS_PER_QUERY = 5
+MAX_RESULTS = 10
+DESCRIPTION_KEYWORDS = 4
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+STOPWORDS = {
+    "the", "and", "for", "with", "about", "that", "this", "from", "into", "what",
+    "how", "why", "are", "was", "were", "will", "would", "should", "could", "their",
+    "there", "they", "them", "your", "our", "its", "also", "more", "most", "some",
+    "any", "all", "new", "latest", "focus", "include", "including", "please", "want",
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """Return the process-wide HTTP session, so connections are reused across searches"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = USER_AGENT
+            _session = session
+        return _session
+
+def html_parser() -> str:
+    """lxml when it is installed (several times faster), else the stdlib parser"""
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+def description_keywords(description: str, limit: int = DESCRIPTION_KEYWORDS) -> List[str]:
+    """The first distinct non-trivial words of the description"""
+    keywords = []
+    for word in re.findall(r"[A-Za-z0-9][A-Za-z0-9+#.-]*", description.lower()):
+        word = word.strip(".-")
+        if len(word) > 2 and word not in STOPWORDS and word not in keywords:
+            keywords.append(word)
+            if len(keywords) == limit:
+                break
+    return keywords
+
+def query_variants(topic: str, description: str = "") -> List[str]:
+    """Search queries for a topic: news, trends and, if given, the description's keywords"""
+    queries = [f"{topic} news", f"{topic} trends"]
+    keywords = description_keywords(description)
+    if keywords:
+        queries.append(f"{topic} {' '.join(keywords)}")
+    return queries
+
+def _result_url(href: str) -> str:
+    """Unwrap DuckDuckGo's redirect links (//duckduckgo.com/l/?uddg=<url>)"""
+    if not href:
+        return ""
+    parsed = urlparse(href)
+    if parsed.path.startswith("/l/"):
+        target = parse_qs(parsed.query).get("uddg")
+        if target:
+            return target[0]
+    if href.startswith("//"):
+        return "https:" + href
+    return href
+
+def parse_results(html: str, limit: int = RESULTS_PER_QUERY) -> List[Dict[str, str]]:
+    """Title, snippet and URL of each result on a DuckDuckGo HTML results page"""
+    soup = bs4.BeautifulSoup(html, html_parser())
+    results = []
+    for result in soup.find_all('div', class_='result'):
+        heading = result.find('h2')
+        snippet = result.find(class_='result__snippet')
+        link = result.find('a', class_='result__a') or (heading.find('a') if heading else None)
+        title = heading.get_text(strip=True) if heading else ""
+        snippet_text = snippet.get_text(strip=True) if snippet else ""
+        if title and snippet_text:
+            results.append({
+                'title': title,
+                'snippet': snippet_text,
+                'url': _result_url(link.get('href', '')) if link else ""
+            })
+            if len(results) == limit:
+                break
+    return results
+
+def fetch_results(query: str, search_url: Optional[str] = None,
+                  timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)) -> List[Dict[str, str]]:
+    """Results for one query; errors are logged and give no results"""
+    try:
+        response = get_session().get(search_url or NEWS_SEARCH_URL, params={'q': query}, timeout=timeout)
+        response.raise_for_status()
+        return parse_results(response.text)
+    except Exception as e:
+        logger.warning(f"News search failed for '{query}': {str(e)}")
+        return []
+
+def _dedupe_key(result: Dict[str, str]) -> str:
+    if result['url']:
+        parsed = urlparse(result['url'])
+        return (parsed.netloc.removeprefix("www.") + parsed.path.rstrip("/")).lower()
+    return re.sub(r"\W+", " ", result['title']).strip().lower()
+
+def search_news(topic: str, description: str = "", max_results: int = MAX_RESULTS,
+                search_url: Optional[str] = None) -> List[Dict[str, str]]:
+    """Search every query variant concurrently and merge the results.
+
+    The queries share the pooled session, so the wall time is that of the
+    slowest single query. Results are interleaved by rank (the top result of
+    each query first) and duplicates, by URL or else title, are dropped.
+    """
+    queries = query_variants(topic, description)
+    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        result_lists = list(executor.map(lambda query: fetch_results(query, search_url), queries))
+
+    merged = []
+    seen = set()
+    for rank in range(max(map(len, result_lists), default=0)):
+        for results in result_lists:
+            if rank < len(results):
+                key = _dedupe_key(results[rank])
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(results[rank])
+    return merged[:max_results]
+
+def format_result(result: Dict[str, str]) -> str:
+    """A result as a prompt bullet, with its URL when known.
+
+    Uses the article summary in place of the search snippet when there is one.
+    """
+    line = f"- {result['title']}: {result.get('summary') or result['snippet']}"
+    return f"{line} ({result['url']})" if result['url'] else line
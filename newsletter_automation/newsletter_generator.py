@@ -1,8 +1,9 @@
-import google.generativeai as genai
 import logging
-import requests
-from bs4 import BeautifulSoup
 from typing import Optional, Dict, List
+from aihub_common.cache import cached_completion
+from aihub_common.services import configure_gemini, get_gemini_model, list_gemini_models
+import news_search
+import articles
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -11,45 +12,34 @@ logger = logging.getLogger(__name__)
 class NewsletterGenerator:
     def __init__(self, api_key: str):
         self.api_key = api_key
-        genai.configure(api_key=api_key)
-        # List available models
-        for m in genai.list_models():
-            logger.info(f"Available model: {m.name}")
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        # Purely local: no API requests are made until a newsletter is generated
+        self.model = get_gemini_model(api_key, 'gemini-2.0-flash')
         logger.info("NewsletterGenerator initialized with Gemini API")
 
-    def search_news(self, topic: str) -> List[Dict[str, str]]:
+    def list_available_models(self, refresh: bool = False) -> List[str]:
+        """Names of the Gemini models this API key can use (one API request, then cached)."""
+        models = list_gemini_models(self.api_key, refresh)
+        for name in models:
+            logger.info(f"Available model: {name}")
+        return models
+
+    def search_news(self, topic: str, description: str = "") -> List[Dict[str, str]]:
         """Search for news articles related to the topic."""
-        try:
-            # Using DuckDuckGo for news search (no API key required)
-            search_url = f"https://duckduckgo.com/html/?q={topic}+news"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(search_url, headers=headers)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            results = []
-            for result in soup.find_all('div', {'class': 'result'})[:5]:  # Get top 5 results
-                title = result.find('h2').get_text() if result.find('h2') else ""
-                snippet = result.find('a', {'class': 'result__snippet'}).get_text() if result.find('a', {'class': 'result__snippet'}) else ""
-                if title and snippet:
-                    results.append({
-                        'title': title,
-                        'snippet': snippet
-                    })
-            
-            logger.info(f"Found {len(results)} news articles for topic: {topic}")
-            return results
-        except Exception as e:
-            logger.error(f"Error searching news: {str(e)}")
-            return []
+        results = news_search.search_news(topic, description)
+        logger.info(f"Found {len(results)} news articles for topic: {topic}")
+        return results
+
+    def generate_newsletter(self, topic: str, description: str = "", read_articles: bool = False) -> Optional[str]:
+        """Generate a newsletter using Gemini.
 
-    def generate_newsletter(self, topic: str, description: str = "") -> Optional[str]:
-        """Generate a newsletter using Gemini."""
+        With read_articles, the top results' pages are downloaded and condensed
+        into short extractive summaries that replace the search snippets.
+        """
         try:
             # Search for relevant news
-            news_articles = self.search_news(topic)
+            news_articles = self.search_news(topic, description)
+            if read_articles:
+                news_articles = articles.add_article_summaries(news_articles)
             
             # Prepare context for Gemini
             context = f"""
@@ -57,7 +47,7 @@ Topic: {topic}
 Additional Description: {description}
 
 Recent News Articles:
-{chr(10).join([f"- {article['title']}: {article['snippet']}" for article in news_articles])}
+{chr(10).join([news_search.format_result(article) for article in news_articles])}
 
 Instructions:
 1. Create an engaging newsletter about the given topic
@@ -69,12 +59,17 @@ Instructions:
 7. Format the content with proper markdown
 """
 
-            # Generate newsletter using Gemini
-            response = self.model.generate_content(context)
+            # Generate newsletter using Gemini, reusing the cached result for identical context
+            configure_gemini(self.api_key)
+            newsletter = cached_completion(
+                lambda: self.model.generate_content(context).text,
+                self.model.model_name,
+                context
+            )
             
-            if response.text:
+            if newsletter:
                 logger.info("Successfully generated newsletter")
-                return response.text
+                return newsletter
             else:
                 logger.error("Empty response from Gemini")
                 return None
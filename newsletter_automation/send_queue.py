@@ -0,0 +1,420 @@
+"""Durable newsletter delivery queue.
+
+Each campaign and each of its recipient deliveries is recorded in SQLite
+before anything is sent, so an interrupted campaign can be resumed without
+sending to anyone twice:
+
+    python send_queue.py status                       # progress of every campaign
+    python send_queue.py resume                       # deliver everything still due
+    python send_queue.py resume --campaign <id> --retry-failed
+
+Resuming reads the SMTP settings from the same environment variables (or .env
+file) as the app.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Make the shared aihub_common package importable when run from the project folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aihub_common.cache import cache_dir
+from bulk_sender import BulkSender, ConnectionFailed, DeliveryError
+
+logger = logging.getLogger(__name__)
+
+# Failed deliveries are retried after RETRY_BASE_SECONDS, doubling per attempt
+# up to RETRY_MAX_SECONDS, and given up after MAX_ATTEMPTS
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+MAX_ATTEMPTS = 6
+
+# A claimed delivery not marked sent or failed within this time (because the
+# process died) becomes due again. Workers lease one delivery at a time, so this
+# must only outlast a single send with all its retries and SMTP timeouts.
+LEASE_SECONDS = 10 * 60
+
+# Longest a worker sleeps while only future retries are left
+MAX_IDLE_WAIT = 5.0
+
+# Pause after a queue database error (e.g. "database is locked") before trying again
+DB_ERROR_WAIT = 5.0
+
+def default_queue_path() -> str:
+    return os.getenv("NEWSLETTER_QUEUE_PATH") or os.path.join(cache_dir(), "newsletter_queue.sqlite3")
+
+def campaign_key(sender: str, subject: str, html: str) -> str:
+    """Idempotency key of a campaign: sending the same newsletter twice queues it once"""
+    return hashlib.sha256("\0".join([sender, subject, html]).encode("utf-8")).hexdigest()[:16]
+
+def delivery_key(campaign_id: str, recipient: str) -> str:
+    """Idempotency key of one delivery, also used as the message's Message-ID"""
+    return hashlib.sha256(f"{campaign_id}\0{recipient.strip().lower()}".encode("utf-8")).hexdigest()[:32]
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before retry number attempts, with jitter so retries don't arrive in bursts"""
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+@dataclass
+class Delivery:
+    key: str
+    campaign_id: str
+    recipient: str
+    attempts: int
+    # Identifies this claim: updates only apply while the delivery still holds it
+    lease_until: float
+
+@dataclass
+class Campaign:
+    id: str
+    sender: str
+    subject: str
+    html: str
+    created_at: float
+
+class SendQueue:
+    """SQLite-backed queue of per-recipient deliveries.
+
+    Deliveries move from pending to sending (claimed with a lease) to sent or
+    failed. Safe to share between threads, and between processes (e.g. the app
+    and a resume command) through SQLite's locking and the claim leases.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_queue_path()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS campaigns (
+                id TEXT PRIMARY KEY,
+                sender TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                html TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS deliveries (
+                key TEXT PRIMARY KEY,
+                campaign_id TEXT NOT NULL REFERENCES campaigns (id),
+                recipient TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                lease_until REAL,
+                last_error TEXT,
+                sent_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS deliveries_due ON deliveries (status, next_attempt_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS deliveries_campaign ON deliveries (campaign_id, status)")
+
+    def _transaction(self, work: Callable[[], object]):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work()
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def add_campaign(self, sender: str, subject: str, html: str, recipients: Iterable[str],
+                     campaign_id: Optional[str] = None) -> str:
+        """Record a campaign and a pending delivery per recipient; returns the campaign id.
+
+        Adding the same campaign again only adds recipients it did not have, so
+        a repeated send neither duplicates nor restarts deliveries.
+        """
+        campaign_id = campaign_id or campaign_key(sender, subject, html)
+        rows = [(delivery_key(campaign_id, recipient), campaign_id, recipient.strip()) for recipient in recipients]
+
+        def work():
+            self._conn.execute(
+                "INSERT OR IGNORE INTO campaigns (id, sender, subject, html, created_at) VALUES (?, ?, ?, ?, ?)",
+                (campaign_id, sender, subject, html, time.time())
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO deliveries (key, campaign_id, recipient) VALUES (?, ?, ?)", rows
+            )
+        self._transaction(work)
+        return campaign_id
+
+    def get_campaign(self, campaign_id: str) -> Optional[Campaign]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, sender, subject, html, created_at FROM campaigns WHERE id = ?", (campaign_id,)
+            ).fetchone()
+        return Campaign(*row) if row else None
+
+    def claim(self, limit: int = 1, campaign_id: Optional[str] = None) -> List[Delivery]:
+        """Lease up to limit due deliveries: pending ones whose retry time has come,
+        and claimed ones whose lease expired."""
+        now = time.time()
+        lease_until = now + LEASE_SECONDS
+        campaign_filter = "AND campaign_id = ?" if campaign_id else ""
+        params = [now, now] + ([campaign_id] if campaign_id else []) + [limit]
+
+        def work():
+            rows = self._conn.execute(
+                "SELECT key, campaign_id, recipient, attempts FROM deliveries "
+                "WHERE ((status = 'pending' AND next_attempt_at <= ?) OR (status = 'sending' AND lease_until <= ?)) "
+                f"{campaign_filter} ORDER BY next_attempt_at LIMIT ?",
+                params
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE deliveries SET status = 'sending', lease_until = ? WHERE key = ?",
+                [(lease_until, row[0]) for row in rows]
+            )
+            return [Delivery(*row, lease_until) for row in rows]
+        return self._transaction(work)
+
+    def release(self, deliveries: List[Delivery]):
+        """Return claimed but unsent deliveries to the queue straight away"""
+        self._transaction(lambda: self._conn.executemany(
+            "UPDATE deliveries SET status = 'pending', lease_until = NULL "
+            "WHERE key = ? AND status = 'sending' AND lease_until = ?",
+            [(delivery.key, delivery.lease_until) for delivery in deliveries]
+        ))
+
+    def _finish(self, delivery: Delivery, assignments: str, params: tuple) -> bool:
+        """Update a claimed delivery if this claim still holds it; False if its lease was lost"""
+        updated = self._transaction(lambda: self._conn.execute(
+            f"UPDATE deliveries SET {assignments}, lease_until = NULL "
+            "WHERE key = ? AND status = 'sending' AND lease_until = ?",
+            params + (delivery.key, delivery.lease_until)
+        ).rowcount)
+        if not updated:
+            logger.warning(f"Lease on delivery to {delivery.recipient} expired before it was recorded")
+        return bool(updated)
+
+    def mark_sent(self, delivery: Delivery) -> bool:
+        return self._finish(
+            delivery, "status = 'sent', attempts = attempts + 1, sent_at = ?, last_error = NULL", (time.time(),)
+        )
+
+    def mark_failed(self, delivery: Delivery, error: str, permanent: bool = False) -> bool:
+        """Schedule a retry with exponential backoff, or give up if permanent or out of attempts"""
+        attempts = delivery.attempts + 1
+        if permanent or attempts >= MAX_ATTEMPTS:
+            status, next_attempt_at = 'failed', 0
+        else:
+            status, next_attempt_at = 'pending', time.time() + retry_delay(attempts)
+        return self._finish(
+            delivery, "status = ?, attempts = ?, next_attempt_at = ?, last_error = ?",
+            (status, attempts, next_attempt_at, error)
+        )
+
+    def retry_failed(self, campaign_id: Optional[str] = None) -> int:
+        """Make failed deliveries due again, with a fresh attempt budget; returns how many"""
+        campaign_filter = "AND campaign_id = ?" if campaign_id else ""
+        return self._transaction(lambda: self._conn.execute(
+            "UPDATE deliveries SET status = 'pending', attempts = 0, next_attempt_at = 0 "
+            f"WHERE status = 'failed' {campaign_filter}",
+            [campaign_id] if campaign_id else []
+        ).rowcount)
+
+    def next_due_in(self, campaign_id: Optional[str] = None) -> Optional[float]:
+        """Seconds until the next unsent delivery is due (0 if one is due now), None when none are left"""
+        campaign_filter = "AND campaign_id = ?" if campaign_id else ""
+        with self._lock:
+            due = self._conn.execute(
+                "SELECT MIN(CASE status WHEN 'pending' THEN next_attempt_at ELSE lease_until END) "
+                f"FROM deliveries WHERE status IN ('pending', 'sending') {campaign_filter}",
+                [campaign_id] if campaign_id else []
+            ).fetchone()[0]
+        return None if due is None else max(0.0, due - time.time())
+
+    def counts(self, campaign_id: Optional[str] = None) -> Dict[str, int]:
+        """Number of deliveries per status"""
+        campaign_filter = "WHERE campaign_id = ?" if campaign_id else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT status, COUNT(*) FROM deliveries {campaign_filter} GROUP BY status",
+                [campaign_id] if campaign_id else []
+            ).fetchall()
+        counts = {'pending': 0, 'sending': 0, 'sent': 0, 'failed': 0}
+        counts.update(rows)
+        return counts
+
+    def failures(self, campaign_id: str, limit: int = 20) -> List[tuple]:
+        """(recipient, last error) of failed deliveries"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT recipient, last_error FROM deliveries WHERE campaign_id = ? AND status = 'failed' LIMIT ?",
+                (campaign_id, limit)
+            ).fetchall()
+
+    def campaigns(self) -> List[Campaign]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, sender, subject, html, created_at FROM campaigns ORDER BY created_at DESC"
+            ).fetchall()
+        return [Campaign(*row) for row in rows]
+
+class QueueDrainer:
+    """Worker threads that deliver due queue entries through a BulkSender.
+
+    build_message(campaign, delivery) returns the email to send. Workers run
+    until nothing is left to send, waiting for scheduled retries, or until stop().
+    If the SMTP server cannot be reached or rejects the login, all workers stop,
+    their deliveries go back to the queue with attempts unchanged, and error
+    says why.
+    """
+
+    def __init__(self, send_queue: SendQueue, bulk_sender: BulkSender,
+                 build_message: Callable[[Campaign, Delivery], object],
+                 workers: Optional[int] = None, campaign_id: Optional[str] = None):
+        self.send_queue = send_queue
+        self.bulk_sender = bulk_sender
+        self.build_message = build_message
+        self.workers = workers or bulk_sender.connections
+        self.campaign_id = campaign_id
+        self._campaigns: Dict[str, Campaign] = {}
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.error: Optional[str] = None
+
+    def _campaign(self, campaign_id: str) -> Campaign:
+        campaign = self._campaigns.get(campaign_id)
+        if campaign is None:
+            campaign = self._campaigns[campaign_id] = self.send_queue.get_campaign(campaign_id)
+        return campaign
+
+    def _deliver(self, delivery: Delivery):
+        try:
+            message = self.build_message(self._campaign(delivery.campaign_id), delivery)
+            self.bulk_sender.send_message(delivery.recipient, message)
+        except ConnectionFailed as e:
+            # Not the recipient's fault: keep its attempts and stop every worker
+            self.send_queue.release([delivery])
+            self.error = str(e)
+            self._stop.set()
+            logger.error(f"Stopped delivering: {str(e)}")
+        except DeliveryError as e:
+            self.send_queue.mark_failed(delivery, e.reason, e.permanent)
+        except Exception as e:
+            self.send_queue.mark_failed(delivery, str(e))
+        else:
+            self.send_queue.mark_sent(delivery)
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                # One delivery per claim, so a lease only has to cover the send in progress
+                deliveries = self.send_queue.claim(1, self.campaign_id)
+                if not deliveries:
+                    wait = self.send_queue.next_due_in(self.campaign_id)
+                    if wait is None:
+                        return
+                    self._stop.wait(min(max(wait, 0.1), MAX_IDLE_WAIT))
+                    continue
+                self._deliver(deliveries[0])
+            except sqlite3.Error as e:
+                # Keep the worker alive; a delivery whose update was lost is re-queued when its lease expires
+                logger.warning(f"Send queue update failed, retrying in {DB_ERROR_WAIT:.0f}s: {str(e)}")
+                self._stop.wait(DB_ERROR_WAIT)
+
+    def start(self) -> "QueueDrainer":
+        """Start the workers in the background (no-op while they are running)"""
+        if self.is_running():
+            return self
+        self._stop.clear()
+        self.error = None
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def is_running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def join(self, timeout: Optional[float] = None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def stop(self):
+        self._stop.set()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and resume newsletter deliveries")
+    parser.add_argument('command', choices=['status', 'resume'])
+    parser.add_argument('--campaign', help="Only this campaign id")
+    parser.add_argument('--retry-failed', action='store_true', help="Also retry deliveries that gave up")
+    parser.add_argument('--queue', help="Queue database (default: NEWSLETTER_QUEUE_PATH or the shared cache directory)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    send_queue = SendQueue(args.queue)
+    if args.command == 'resume':
+        from dotenv import load_dotenv
+        from email_sender import EmailSender
+
+        load_dotenv()
+        email_sender = EmailSender(
+            smtp_server=os.getenv('SMTP_SERVER', 'smtp.gmail.com'),
+            smtp_port=int(os.getenv('SMTP_PORT', '587')),
+            sender_email=os.getenv('SENDER_EMAIL', ''),
+            sender_password=os.getenv('SENDER_PASSWORD', '')
+        )
+        # Only campaigns sent from this account can be delivered with its credentials
+        if args.campaign:
+            campaign = send_queue.get_campaign(args.campaign)
+            if campaign is None:
+                sys.exit(f"No campaign {args.campaign}")
+            if campaign.sender != email_sender.sender_email:
+                sys.exit(f"Campaign {args.campaign} was sent from {campaign.sender}, but SENDER_EMAIL is "
+                         f"{email_sender.sender_email or '(not set)'}; resume it with that account's settings")
+            campaign_ids = [args.campaign]
+        else:
+            campaign_ids = [
+                campaign.id for campaign in send_queue.campaigns() if campaign.sender == email_sender.sender_email
+            ]
+        if args.retry_failed:
+            retried = sum(send_queue.retry_failed(campaign_id) for campaign_id in campaign_ids)
+            print(f"Retrying {retried} failed deliveries")
+        try:
+            for campaign_id in campaign_ids:
+                drainer = email_sender.queue_drainer(send_queue, campaign_id).start()
+                try:
+                    while drainer.is_running():
+                        drainer.join(timeout=10)
+                        counts = send_queue.counts(campaign_id)
+                        print(f"{campaign_id}: sent {counts['sent']:,}, "
+                              f"pending {counts['pending'] + counts['sending']:,}, failed {counts['failed']:,}")
+                    if drainer.error:
+                        sys.exit(f"Stopped: {drainer.error}")
+                except KeyboardInterrupt:
+                    drainer.stop()
+                    drainer.join()
+                    raise
+        except KeyboardInterrupt:
+            print("Stopped; run resume again to continue")
+        finally:
+            email_sender.get_bulk_sender().close()
+
+    campaigns = [send_queue.get_campaign(args.campaign)] if args.campaign else send_queue.campaigns()
+    for campaign in campaigns:
+        if campaign is None:
+            print(f"No campaign {args.campaign}")
+            continue
+        counts = send_queue.counts(campaign.id)
+        created = time.strftime('%Y-%m-%d %H:%M', time.localtime(campaign.created_at))
+        print(f"{campaign.id}  {created}  {campaign.subject!r}: sent {counts['sent']:,}, "
+              f"pending {counts['pending'] + counts['sending']:,}, failed {counts['failed']:,}")
+        for recipient, error in send_queue.failures(campaign.id, limit=5):
+            print(f"    failed {recipient}: {error}")
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,27 @@
 import streamlit as st
-import google.generativeai as genai
-import PyPDF2
 import os
+import sys
 from dotenv import load_dotenv
-import tempfile
+
+# Make the shared aihub_common package importable when run from the project folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aihub_common.cache import cached_completion, llm_cache_summary
+from aihub_common.retrieval import build_index
+from aihub_common.services import get_gemini_model
+from aihub_common.extraction import cached_pdf_text, document_digest
 
 # Load environment variables
 load_dotenv()
 
 # Configure Gemini API
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
-genai.configure(api_key=GOOGLE_API_KEY)
 
-# Initialize Gemini model
-model = genai.GenerativeModel('gemini-2.0-flash')
+# Gemini model handle, shared across reruns and sessions
+model = get_gemini_model(GOOGLE_API_KEY, 'gemini-2.0-flash')
+
+# Upload limit and retrieval settings
+MAX_FILE_SIZE_MB = 50
+TOP_K_PASSAGES = 6
 
 # Set page config
 st.set_page_config(
@@ -27,23 +35,28 @@ if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
 if 'pdf_content' not in st.session_state:
     st.session_state.pdf_content = None
-
-def extract_text_from_pdf(pdf_file):
-    """Extract text from PDF file"""
-    pdf_reader = PyPDF2.PdfReader(pdf_file)
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    return text
-
-def get_gemini_response(prompt, pdf_content):
+if 'pdf_index' not in st.session_state:
+    st.session_state.pdf_index = None
+if 'pdf_file_id' not in st.session_state:
+    st.session_state.pdf_file_id = None
+
+def retrieve_passages(prompt, pdf_index, top_k=TOP_K_PASSAGES):
+    """Get the passages most relevant to the question from the PDF index"""
+    passages = [passage for _, passage in pdf_index.search(prompt, top_k)]
+    if not passages:
+        # Nothing matched lexically, fall back to the start of the document
+        passages = pdf_index.passages[:top_k]
+    return passages
+
+def get_gemini_response(prompt, pdf_index):
     """Get response from Gemini model"""
-    context = f"Based on the following PDF content, please answer the question. If the answer cannot be found in the PDF content, please say so.\n\nPDF Content:\n{pdf_content}\n\nQuestion: {prompt}"
+    passages = "\n\n---\n\n".join(retrieve_passages(prompt, pdf_index))
+    context = f"Based on the following excerpts from a PDF, please answer the question. If the answer cannot be found in the excerpts, please say so.\n\nPDF Excerpts:\n{passages}\n\nQuestion: {prompt}"
     
-    response = model.generate_content(context)
-    return response.text
+    return cached_completion(lambda: model.generate_content(context).text, model.model_name, context)
 
 # Main UI
+st.sidebar.caption(llm_cache_summary())
 st.title("📚 PDF Chatbot")
 st.write("Upload a PDF file and ask questions about its content!")
 
@@ -51,24 +64,21 @@ st.write("Upload a PDF file and ask questions about its content!")
 uploaded_file = st.file_uploader("Choose a PDF file", type="pdf")
 
 if uploaded_file is not None:
-    # Check file size (2MB limit)
-    if uploaded_file.size > 2 * 1024 * 1024:  # 2MB in bytes
-        st.error("File size exceeds 2MB limit. Please upload a smaller file.")
+    # Check file size
+    if uploaded_file.size > MAX_FILE_SIZE_MB * 1024 * 1024:
+        st.error(f"File size exceeds {MAX_FILE_SIZE_MB}MB limit. Please upload a smaller file.")
     else:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_file_path = tmp_file.name
-
-        # Extract text from PDF
-        if st.session_state.pdf_content is None:
+        # Extract text and build the retrieval index once per document; keyed by
+        # content, since a different file can share the previous one's name and size
+        file_id = document_digest(uploaded_file)
+        if st.session_state.pdf_file_id != file_id:
             with st.spinner("Processing PDF..."):
-                st.session_state.pdf_content = extract_text_from_pdf(tmp_file_path)
+                st.session_state.pdf_content = cached_pdf_text(uploaded_file)
+                st.session_state.pdf_index = build_index(st.session_state.pdf_content)
+                st.session_state.pdf_file_id = file_id
+                st.session_state.chat_history = []
                 st.success("PDF processed successfully!")
 
-        # Remove temporary file
-        os.unlink(tmp_file_path)
-
         # Display chat interface
         st.subheader("Chat with your PDF")
         
@@ -87,7 +97,7 @@ if uploaded_file is not None:
             # Get and display assistant response
             with st.chat_message("assistant"):
                 with st.spinner("Thinking..."):
-                    response = get_gemini_response(prompt, st.session_state.pdf_content)
+                    response = get_gemini_response(prompt, st.session_state.pdf_index)
                     st.write(response)
                     st.session_state.chat_history.append({"role": "assistant", "content": response})
 
@@ -1,16 +1,23 @@
 import streamlit as st
-import google.generativeai as genai
-import PyPDF2
-from docx import Document
-import pandas as pd
 import os
+import sys
 from io import BytesIO
 from dotenv import load_dotenv
 
+# Make the shared aihub_common package importable when run from the project folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aihub_common.cache import cached_completion, llm_cache_summary
+from aihub_common.services import get_gemini_model
+from aihub_common.extraction import cached_pdf_text, cached_docx_text
+from aihub_common.lazy import lazy_import
+
+# Only needed once a resume is analyzed
+pd = lazy_import("pandas")
+
 # Load environment variables (if available)
 load_dotenv()
 
-def initialize_gemini_api():
+def get_api_key():
     # Try to get API key from environment first
     api_key = os.getenv('GOOGLE_API_KEY')
     
@@ -18,10 +25,7 @@ def initialize_gemini_api():
     if not api_key and 'GOOGLE_API_KEY' in st.session_state:
         api_key = st.session_state.GOOGLE_API_KEY
     
-    if api_key:
-        genai.configure(api_key=api_key)
-        return True
-    return False
+    return api_key
 
 def setup_api_key():
     st.sidebar.markdown("## API Configuration")
@@ -39,20 +43,6 @@ def setup_api_key():
         return True
     return False
 
-def extract_text_from_pdf(pdf_file):
-    pdf_reader = PyPDF2.PdfReader(pdf_file)
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    return text
-
-def extract_text_from_docx(docx_file):
-    doc = Document(docx_file)
-    text = ""
-    for paragraph in doc.paragraphs:
-        text += paragraph.text + "\n"
-    return text
-
 def process_resume(text, model):
     # Education information extraction
     education_prompt = f"""
@@ -70,8 +60,9 @@ def process_resume(text, model):
     {text}
     """
     
-    education_response = model.generate_content(education_prompt)
-    education_table = education_response.text
+    education_table = cached_completion(
+        lambda: model.generate_content(education_prompt).text, model.model_name, education_prompt
+    )
 
     # Skills analysis for Python/AI development
     skills_prompt = f"""
@@ -88,8 +79,9 @@ def process_resume(text, model):
     {text}
     """
     
-    skills_response = model.generate_content(skills_prompt)
-    skills_summary = skills_response.text
+    skills_summary = cached_completion(
+        lambda: model.generate_content(skills_prompt).text, model.model_name, skills_prompt
+    )
     
     return education_table, skills_summary
 
@@ -131,8 +123,7 @@ def main():
     st.markdown("<h1 style='text-align: center;'>📝 Software Engineer Resume Analyzer</h1>", unsafe_allow_html=True)
     
     # Setup API key configuration
-    api_configured = initialize_gemini_api()
-    if not api_configured:
+    if not get_api_key():
         # Application description
         st.markdown("""
             <div class='info-box'>
@@ -161,12 +152,14 @@ def main():
             st.stop()
     
     try:
-        # Initialize model after API key is configured
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        # Shared model handle for this API key, built once per process
+        model = get_gemini_model(get_api_key(), 'gemini-1.5-flash')
     except Exception as e:
         st.error("Error initializing Gemini model. Please check your API key.")
         st.stop()
     
+    st.sidebar.caption(llm_cache_summary())
+    
     # File upload section with styling
     st.markdown("<div class='upload-section'>", unsafe_allow_html=True)
     st.markdown("### 📤 Upload Resume")
@@ -178,9 +171,9 @@ def main():
         try:
             # Extract text based on file type
             if uploaded_file.type == "application/pdf":
-                text = extract_text_from_pdf(uploaded_file)
+                text = cached_pdf_text(uploaded_file)
             else:
-                text = extract_text_from_docx(uploaded_file)
+                text = cached_docx_text(uploaded_file)
             
             # Process the resume
             with st.spinner("🔄 Analyzing resume..."):
@@ -1,64 +1,13 @@
 import streamlit as st
-import tiktoken
-from docx import Document
-from PyPDF2 import PdfReader
 import io
+import os
+import sys
 
-def get_model_pricing():
-    """Return pricing information for different AI models."""
-    return {
-        "OpenAI": {
-            "GPT-4 Turbo": {"input": 0.01, "output": 0.03},
-            "GPT-4": {"input": 0.03, "output": 0.06},
-            "GPT-3.5 Turbo": {"input": 0.0005, "output": 0.0015}
-        },
-        "Anthropic": {
-            "Claude 3 Opus": {"input": 0.015, "output": 0.075},
-            "Claude 3.5 Sonnet": {"input": 0.003, "output": 0.015},
-            "Claude 3 Haiku": {"input": 0.00025, "output": 0.00125}
-        },
-        "Google": {
-            "Gemini 2.0 Flash": {"input": 0.0010, "output": 0.0040},
-            "Gemini 1.5 Pro": {"input": 0.00125, "output": 0.005},
-            "Gemini 1.5 Flash": {"input": 0.00075, "output": 0.003}
-        }
-    }
-
-def count_tokens(text, model="gpt-3.5-turbo"):
-    """Count the number of tokens in the text using the specified model's tokenizer."""
-    encoding = tiktoken.encoding_for_model(model)
-    return len(encoding.encode(text))
-
-def extract_text_from_pdf(pdf_file):
-    """Extract text from a PDF file."""
-    pdf_reader = PdfReader(pdf_file)
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    return text
-
-def extract_text_from_docx(docx_file):
-    """Extract text from a DOCX file."""
-    doc = Document(docx_file)
-    text = ""
-    for paragraph in doc.paragraphs:
-        text += paragraph.text + "\n"
-    return text
-
-def calculate_costs(token_count, pricing_info):
-    """Calculate costs for different providers and models."""
-    costs = {}
-    for provider, models in pricing_info.items():
-        costs[provider] = {}
-        for model, prices in models.items():
-            input_cost = (token_count / 1000) * prices["input"]
-            output_cost = (token_count / 1000) * prices["output"]
-            costs[provider][model] = {
-                "input": input_cost,
-                "output": output_cost,
-                "total": input_cost + output_cost
-            }
-    return costs
+# Make the shared aihub_common package importable when run from the project folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aihub_common.extraction import cached_pdf_pages, cached_docx_text
+from estimator import get_model_pricing, calculate_costs
+from token_counting import count_document
 
 def main():
     st.set_page_config(
@@ -86,7 +35,7 @@ def main():
     # Main content
     st.title("📄 Document Token - LLM Costing Estimator")
     st.write("""
-    This tool uses OpenAI's tiktoken library to estimate tokens similar to how they're counted in various AI models.
+    This tool counts tokens with each model's own tokenizer where one is available offline (OpenAI's tiktoken), and with calibrated estimates for Anthropic and Google models.
     Upload your document using the sidebar to get started.
     """)
 
@@ -97,17 +46,16 @@ def main():
                 # Extract text based on file type
                 file_extension = uploaded_file.name.split('.')[-1].lower()
                 
+                # Count tokens for every model page by page, in one pass over the text
+                pricing_info = get_model_pricing()
                 if file_extension == 'pdf':
-                    text = extract_text_from_pdf(uploaded_file)
+                    stats = count_document((page.text for page in cached_pdf_pages(uploaded_file)), pricing_info)
                 elif file_extension == 'docx':
-                    text = extract_text_from_docx(uploaded_file)
-                
-                # Count tokens
-                token_count = count_tokens(text)
+                    stats = count_document([cached_docx_text(uploaded_file)], pricing_info)
+                token_count = stats["tokens"]["OpenAI"]["GPT-3.5 Turbo"]
                 
                 # Calculate costs for different providers
-                pricing_info = get_model_pricing()
-                costs = calculate_costs(token_count, pricing_info)
+                costs = calculate_costs(stats["tokens"], pricing_info)
                 
                 # Display results
                 st.success('✅ Document processed successfully!')
@@ -115,12 +63,12 @@ def main():
                 col1, col2 = st.columns([1, 2])
                 with col1:
                     st.write("### Token Count")
-                    st.metric("Total Tokens", f"{token_count:,}")
+                    st.metric("Total Tokens (GPT tokenizer)", f"{token_count:,}")
                     
                     st.write("### Document Statistics")
-                    st.metric("Characters", f"{len(text):,}")
-                    st.metric("Words", f"{len(text.split()):,}")
-                    st.metric("Avg Tokens/Word", f"{token_count/len(text.split()):.2f}")
+                    st.metric("Characters", f"{stats['characters']:,}")
+                    st.metric("Words", f"{stats['words']:,}")
+                    st.metric("Avg Tokens/Word", f"{token_count/max(stats['words'], 1):.2f}")
                 
                 with col2:
                     st.write("### Cost Estimates by Provider")
@@ -131,7 +79,8 @@ def main():
                         with tab:
                             st.write(f"#### {provider} Models")
                             for model, cost in models.items():
-                                st.write(f"**{model}**")
+                                approx = "" if cost["exact"] else "≈ "
+                                st.write(f"**{model}** · {approx}{cost['tokens']:,} tokens")
                                 cols = st.columns(3)
                                 cols[0].metric("Input Cost", f"${cost['input']:.4f}")
                                 cols[1].metric("Output Cost", f"${cost['output']:.4f}")
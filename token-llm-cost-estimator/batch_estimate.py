@@ -0,0 +1,271 @@
+"""Estimate tokens and costs for a whole corpus of PDF/DOCX documents.
+
+Walks a directory (recursively) or a .zip/.tar archive, processes documents in
+a process pool, streams one row per document to CSV or Parquet, and prints
+corpus totals per model.
+
+    python batch_estimate.py documents/ --output results.csv
+    python batch_estimate.py corpus.zip --output results.parquet --totals totals.csv --processes 8
+
+The same pipeline is importable: estimate_corpus() yields one row per document
+and CorpusTotals sums them.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import tarfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from estimator import SUPPORTED_EXTENSIONS, get_model_pricing, iter_document_texts, estimate_document
+from token_counting import load_encodings
+from aihub_common.lazy import lazy_import
+
+# Only needed for Parquet output
+pyarrow = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
+
+# Documents submitted to the pool ahead of the ones being processed, per worker
+IN_FLIGHT_PER_PROCESS = 4
+
+# Rows buffered before a Parquet row group is written
+PARQUET_ROW_GROUP = 1000
+
+def iter_jobs(corpus):
+    """Yield one job per supported document in a directory or archive.
+
+    Jobs are (kind, location, name) tuples: files and zip members are opened by
+    the worker itself; tar members, which cannot be read out of order cheaply,
+    are read here and sent as bytes.
+    """
+    def supported(name):
+        return name.lower().endswith(SUPPORTED_EXTENSIONS)
+
+    if os.path.isdir(corpus):
+        for root, _, files in os.walk(corpus):
+            for filename in sorted(files):
+                if supported(filename):
+                    path = os.path.join(root, filename)
+                    yield ('file', path, os.path.relpath(path, corpus))
+    # Tar first: is_zipfile also matches a tar holding a .docx (itself a zip)
+    elif tarfile.is_tarfile(corpus):
+        with tarfile.open(corpus) as archive:
+            for member in archive:
+                if member.isfile() and supported(member.name):
+                    yield ('bytes', archive.extractfile(member).read(), member.name)
+    elif zipfile.is_zipfile(corpus):
+        with zipfile.ZipFile(corpus) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and supported(info.filename):
+                    yield ('zip', corpus, info.filename)
+    else:
+        raise ValueError(f"{corpus} is not a directory, zip or tar archive")
+
+class ExtractionError(Exception):
+    """A document could not be read or parsed; recorded in its row instead of failing the run"""
+
+def read_document(job):
+    """Yield the text of a job's document, raising ExtractionError if it cannot be read"""
+    kind, location, name = job
+    try:
+        if kind == 'zip':
+            with zipfile.ZipFile(location) as archive:
+                source = archive.read(name)
+        elif kind == 'bytes':
+            source = io.BytesIO(location)
+        else:
+            source = location
+        yield from iter_document_texts(source, name)
+    except Exception as e:
+        raise ExtractionError(f"{type(e).__name__}: {str(e)}") from e
+
+def estimate_job(job):
+    """Worker: estimate one document, returning a flat result row.
+
+    Only extraction failures become error rows; anything else (a tokenizer that
+    fails to load, say) is raised and stops the run.
+    """
+    row = {'file': job[2], 'error': ''}
+    try:
+        stats = estimate_document(read_document(job), num_threads=1)
+    except ExtractionError as e:
+        row['error'] = str(e)
+        return row
+
+    row['characters'] = stats['characters']
+    row['words'] = stats['words']
+    for provider, models in stats['costs'].items():
+        for model, cost in models.items():
+            row[f"{provider} / {model} tokens"] = cost['tokens']
+            row[f"{provider} / {model} cost"] = round(cost['total'], 6)
+    return row
+
+def result_columns(pricing_info):
+    """Column order for result files"""
+    columns = ['file', 'characters', 'words']
+    for provider, models in pricing_info.items():
+        for model in models:
+            columns += [f"{provider} / {model} tokens", f"{provider} / {model} cost"]
+    return columns + ['error']
+
+def estimate_corpus(corpus, processes=None):
+    """Yield a result row per document as documents finish (not in corpus order).
+
+    At most IN_FLIGHT_PER_PROCESS documents per worker are queued at a time, so
+    memory stays flat however large the corpus is. Each worker loads the
+    tokenizers once at startup; if that fails, the pool breaks and the error is
+    raised here rather than recorded against every document.
+    """
+    processes = processes or os.cpu_count() or 1
+    jobs = iter_jobs(corpus)
+    max_in_flight = processes * IN_FLIGHT_PER_PROCESS
+    with ProcessPoolExecutor(max_workers=processes, initializer=load_encodings,
+                             initargs=(get_model_pricing(),)) as executor:
+        pending = set()
+        for job in jobs:
+            pending.add(executor.submit(estimate_job, job))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+class CorpusTotals:
+    """Running per-model totals over result rows"""
+
+    def __init__(self, pricing_info):
+        self.pricing_info = pricing_info
+        self.documents = 0
+        self.failed = 0
+        self.characters = 0
+        self.tokens = {(provider, model): 0 for provider, models in pricing_info.items() for model in models}
+
+    def add(self, row):
+        if row['error']:
+            self.failed += 1
+            return
+        self.documents += 1
+        self.characters += row['characters']
+        for provider, model in self.tokens:
+            self.tokens[(provider, model)] += row[f"{provider} / {model} tokens"]
+
+    def rows(self):
+        """One row per model with corpus token totals and costs"""
+        for (provider, model), tokens in self.tokens.items():
+            prices = self.pricing_info[provider][model]
+            input_cost = tokens / 1000 * prices['input']
+            output_cost = tokens / 1000 * prices['output']
+            yield {
+                'provider': provider,
+                'model': model,
+                'tokens': tokens,
+                'input_cost': round(input_cost, 2),
+                'output_cost': round(output_cost, 2),
+                'total_cost': round(input_cost + output_cost, 2)
+            }
+
+class ResultWriter:
+    """Streams result rows to a .csv or .parquet file as they arrive"""
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+        self.parquet = path.lower().endswith('.parquet')
+        self._buffer = []
+        self._writer = None
+        if self.parquet:
+            # Import now, so a missing pyarrow fails before any document is processed
+            try:
+                import pyarrow.parquet  # noqa: F401
+            except ImportError as e:
+                raise ImportError("Parquet output needs pyarrow (pip install pyarrow)") from e
+            self._file = None
+        else:
+            self._file = open(path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(self._file, fieldnames=columns)
+            self._writer.writeheader()
+
+    def write(self, row):
+        if not self.parquet:
+            self._writer.writerow(row)
+            return
+        self._buffer.append(row)
+        if len(self._buffer) >= PARQUET_ROW_GROUP:
+            self._flush_parquet()
+
+    def _flush_parquet(self):
+        if not self._buffer:
+            return
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, self._parquet_schema())
+        table = pyarrow.Table.from_pylist(
+            [{column: row.get(column) for column in self.columns} for row in self._buffer],
+            schema=self._writer.schema
+        )
+        self._writer.write_table(table)
+        self._buffer = []
+
+    def _parquet_schema(self):
+        # Fixed up front, so row groups of failed documents don't infer null columns
+        def column_type(column):
+            if column in ('file', 'error'):
+                return pyarrow.string()
+            if column.endswith(' cost'):
+                return pyarrow.float64()
+            return pyarrow.int64()
+        return pyarrow.schema([(column, column_type(column)) for column in self.columns])
+
+    def close(self):
+        if self.parquet:
+            self._flush_parquet()
+            if self._writer is not None:
+                self._writer.close()
+        else:
+            self._file.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estimate LLM tokens and costs for a corpus of PDF/DOCX documents")
+    parser.add_argument('corpus', help="Directory, .zip or .tar archive of documents")
+    parser.add_argument('--output', default='token_estimates.csv', help="Per-document results (.csv or .parquet)")
+    parser.add_argument('--totals', help="Optional CSV file for corpus totals per model")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help="Worker processes")
+    args = parser.parse_args(argv)
+
+    pricing_info = get_model_pricing()
+    try:
+        load_encodings(pricing_info)
+    except Exception as e:
+        sys.exit(f"Could not load tokenizers: {type(e).__name__}: {str(e)}")
+    try:
+        writer = ResultWriter(args.output, result_columns(pricing_info))
+    except ImportError as e:
+        sys.exit(str(e))
+    totals = CorpusTotals(pricing_info)
+    try:
+        for count, row in enumerate(estimate_corpus(args.corpus, args.processes), start=1):
+            writer.write(row)
+            totals.add(row)
+            if row['error']:
+                print(f"Failed: {row['file']} ({row['error']})", file=sys.stderr)
+            if count % 100 == 0:
+                print(f"{count:,} documents processed", file=sys.stderr)
+    finally:
+        writer.close()
+
+    total_rows = list(totals.rows())
+    print(f"\n{totals.documents:,} documents ({totals.failed:,} failed), {totals.characters:,} characters")
+    print(f"{'model':<32} {'tokens':>16} {'input $':>12} {'output $':>12} {'total $':>12}")
+    for row in total_rows:
+        print(f"{row['provider'] + ' / ' + row['model']:<32} {row['tokens']:>16,} "
+              f"{row['input_cost']:>12,.2f} {row['output_cost']:>12,.2f} {row['total_cost']:>12,.2f}")
+    if args.totals:
+        with open(args.totals, 'w', newline='', encoding='utf-8') as f:
+            totals_writer = csv.DictWriter(f, fieldnames=list(total_rows[0]))
+            totals_writer.writeheader()
+            totals_writer.writerows(total_rows)
+    print(f"\nPer-document results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Token and cost estimation shared by the Streamlit app and the batch CLI."""
+import os
+import sys
+
+# Make the shared aihub_common package importable when run from the project folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aihub_common.extraction import iter_pdf_pages, extract_docx_text
+from token_counting import count_document, get_tokenizer, ENCODE_THREADS
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx')
+
+def get_model_pricing():
+    """Return pricing information for different AI models."""
+    return {
+        "OpenAI": {
+            "GPT-4 Turbo": {"input": 0.01, "output": 0.03},
+            "GPT-4": {"input": 0.03, "output": 0.06},
+            "GPT-3.5 Turbo": {"input": 0.0005, "output": 0.0015}
+        },
+        "Anthropic": {
+            "Claude 3 Opus": {"input": 0.015, "output": 0.075},
+            "Claude 3.5 Sonnet": {"input": 0.003, "output": 0.015},
+            "Claude 3 Haiku": {"input": 0.00025, "output": 0.00125}
+        },
+        "Google": {
+            "Gemini 2.0 Flash": {"input": 0.0010, "output": 0.0040},
+            "Gemini 1.5 Pro": {"input": 0.00125, "output": 0.005},
+            "Gemini 1.5 Flash": {"input": 0.00075, "output": 0.003}
+        }
+    }
+
+def calculate_costs(token_counts, pricing_info):
+    """Calculate costs for different providers and models.
+
+    token_counts is {provider: {model: tokens}} as returned by count_tokens_by_model.
+    """
+    costs = {}
+    for provider, models in pricing_info.items():
+        costs[provider] = {}
+        for model, prices in models.items():
+            token_count = token_counts[provider][model]
+            input_cost = (token_count / 1000) * prices["input"]
+            output_cost = (token_count / 1000) * prices["output"]
+            costs[provider][model] = {
+                "input": input_cost,
+                "output": output_cost,
+                "total": input_cost + output_cost,
+                "tokens": token_count,
+                "exact": get_tokenizer(provider, model).exact
+            }
+    return costs
+
+def iter_document_texts(source, filename):
+    """Stream a document's text as PDF pages, or a DOCX file as one text, chosen by file extension.
+
+    The texts are the ones the app counts, so both give the same statistics.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.pdf':
+        return (page.text for page in iter_pdf_pages(source))
+    if extension == '.docx':
+        # Paragraphs joined by newlines, like cached_docx_text in the app
+        return [extract_docx_text(source)]
+    raise ValueError(f"Unsupported file type: {filename}")
+
+def estimate_document(texts, pricing_info=None, num_threads=ENCODE_THREADS):
+    """Token counts, document statistics and costs for a document streamed as texts"""
+    pricing_info = pricing_info or get_model_pricing()
+    stats = count_document(texts, pricing_info, num_threads)
+    stats["costs"] = calculate_costs(stats["tokens"], pricing_info)
+    return stats
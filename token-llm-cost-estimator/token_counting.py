@@ -0,0 +1,190 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from aihub_common.lazy import lazy_import
+
+# Imported on first count; loading an encoding reads (or downloads) its BPE ranks
+tiktoken = lazy_import("tiktoken")
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+# Long texts are encoded in chunks of about this many characters, several at a
+# time, so a large document never needs its full token list in memory at once
+CHUNK_CHARS = 100_000
+ENCODE_THREADS = os.cpu_count() or 1
+
+@dataclass(frozen=True)
+class Tokenizer:
+    """How tokens are counted for a model.
+
+    encoding is the offline tiktoken encoding that is run over the text. For
+    providers without a public offline tokenizer, scale converts that count
+    into a calibrated estimate of the provider's own count (see calibrate_scale).
+    """
+    encoding: str
+    scale: float = 1.0
+    exact: bool = True
+
+    def tokens(self, base_count):
+        return round(base_count * self.scale)
+
+# Starting estimates for English prose. Re-run calibrate_scale against the
+# provider's token-counting API on your own documents and update these.
+CLAUDE_CL100K_SCALE = 1.20  # Claude 3 / 3.5 tokens per cl100k token
+GEMINI_CL100K_SCALE = 1.04  # Gemini 1.5 / 2.0 tokens per cl100k token
+
+# Tokenizer used for any model of a provider without its own registry entry
+PROVIDER_TOKENIZERS = {
+    "OpenAI": Tokenizer("cl100k_base"),
+    "Anthropic": Tokenizer("cl100k_base", scale=CLAUDE_CL100K_SCALE, exact=False),
+    "Google": Tokenizer("cl100k_base", scale=GEMINI_CL100K_SCALE, exact=False),
+}
+
+# Per-model overrides, keyed by the model names used in get_model_pricing
+MODEL_TOKENIZERS = {
+    "GPT-4 Turbo": Tokenizer("cl100k_base"),
+    "GPT-4": Tokenizer("cl100k_base"),
+    "GPT-3.5 Turbo": Tokenizer("cl100k_base"),
+}
+
+def register_tokenizer(model, tokenizer):
+    """Use tokenizer when counting tokens for model"""
+    MODEL_TOKENIZERS[model] = tokenizer
+
+def get_tokenizer(provider, model):
+    """Return the tokenizer for a priced model, falling back to its provider's default"""
+    return MODEL_TOKENIZERS.get(model) or PROVIDER_TOKENIZERS[provider]
+
+@lru_cache(maxsize=None)
+def get_encoding(model=DEFAULT_MODEL):
+    """Return the tiktoken encoding for a model, loading it once per process"""
+    return tiktoken.encoding_for_model(model)
+
+@lru_cache(maxsize=None)
+def get_encoding_by_name(name):
+    """Return a tiktoken encoding by name (e.g. cl100k_base), loading it once per process"""
+    return tiktoken.get_encoding(name)
+
+def load_encodings(pricing_info):
+    """Load every encoding the priced models use, returning {name: encoding}.
+
+    Call it before processing documents so a tokenizer that cannot be loaded
+    (e.g. no network to fetch its BPE ranks) fails the run up front.
+    """
+    names = {get_tokenizer(provider, model).encoding for provider, models in pricing_info.items() for model in models}
+    return {name: get_encoding_by_name(name) for name in names}
+
+def split_text(text, chunk_chars=CHUNK_CHARS):
+    """Split text into pieces of about chunk_chars, breaking before a space.
+
+    tiktoken attaches a leading space to the following word, so breaking there
+    gives the same tokens as encoding the whole text.
+    """
+    start = 0
+    while len(text) - start > chunk_chars:
+        end = text.rfind(" ", start + 1, start + chunk_chars)
+        if end == -1:
+            end = start + chunk_chars
+        yield text[start:end]
+        start = end
+    yield text[start:]
+
+def iter_chunks(texts, chunk_chars=CHUNK_CHARS):
+    """Yield pieces of at most about chunk_chars from an iterable of texts"""
+    for text in texts:
+        if len(text) > chunk_chars:
+            yield from split_text(text, chunk_chars)
+        elif text:
+            yield text
+
+def _count_batch(encoding, batch, num_threads):
+    if len(batch) == 1:
+        return len(encoding.encode(batch[0], disallowed_special=()))
+    tokens = encoding.encode_batch(batch, num_threads=num_threads, disallowed_special=())
+    return sum(len(chunk_tokens) for chunk_tokens in tokens)
+
+def count_tokens_multi(texts, encodings, chunk_chars=CHUNK_CHARS, num_threads=ENCODE_THREADS):
+    """Count tokens under several encodings in a single pass over the texts.
+
+    encodings maps a key to a tiktoken Encoding; returns {key: token count}.
+    Pieces are encoded num_threads at a time with encode_batch, the encodings
+    run concurrently, and only their token counts are kept.
+    """
+    totals = {key: 0 for key in encodings}
+
+    def count(batch):
+        if len(encodings) == 1:
+            key, encoding = next(iter(encodings.items()))
+            totals[key] += _count_batch(encoding, batch, num_threads)
+            return
+        with ThreadPoolExecutor(max_workers=len(encodings)) as executor:
+            futures = {
+                key: executor.submit(_count_batch, encoding, batch, num_threads)
+                for key, encoding in encodings.items()
+            }
+            for key, future in futures.items():
+                totals[key] += future.result()
+
+    batch = []
+    batch_chars = 0
+    for chunk in iter_chunks(texts, chunk_chars):
+        batch.append(chunk)
+        batch_chars += len(chunk)
+        if batch_chars >= chunk_chars * num_threads:
+            count(batch)
+            batch = []
+            batch_chars = 0
+    if batch:
+        count(batch)
+    return totals
+
+def count_tokens_iter(texts, model=DEFAULT_MODEL, chunk_chars=CHUNK_CHARS, num_threads=ENCODE_THREADS):
+    """Count the tokens in an iterable of texts, e.g. pages as they are extracted."""
+    return count_tokens_multi(texts, {model: get_encoding(model)}, chunk_chars, num_threads)[model]
+
+def count_tokens(text, model=DEFAULT_MODEL):
+    """Count the number of tokens in the text using the specified model's tokenizer."""
+    return count_tokens_iter([text], model)
+
+def count_tokens_by_model(texts, pricing_info, num_threads=ENCODE_THREADS):
+    """Token count for every priced model, from one pass over the texts.
+
+    Each distinct encoding is run once and shared by all models that use it;
+    returns {provider: {model: token count}}.
+    """
+    tokenizers = {
+        (provider, model): get_tokenizer(provider, model)
+        for provider, models in pricing_info.items()
+        for model in models
+    }
+    encodings = load_encodings(pricing_info)
+    base_counts = count_tokens_multi(texts, encodings, num_threads=num_threads)
+
+    counts = {provider: {} for provider in pricing_info}
+    for (provider, model), tokenizer in tokenizers.items():
+        counts[provider][model] = tokenizer.tokens(base_counts[tokenizer.encoding])
+    return counts
+
+def count_document(texts, pricing_info, num_threads=ENCODE_THREADS):
+    """Per-model token counts plus character and word counts for a document streamed as pages or paragraphs"""
+    stats = {"characters": 0, "words": 0}
+
+    def tracked():
+        for text in texts:
+            stats["characters"] += len(text)
+            stats["words"] += len(text.split())
+            yield text
+
+    stats["tokens"] = count_tokens_by_model(tracked(), pricing_info, num_threads)
+    return stats
+
+def calibrate_scale(texts, reference_counts, encoding="cl100k_base"):
+    """Scale that maps encoding's counts onto a provider's reference counts.
+
+    reference_counts are the provider's own counts for the same texts, e.g. from
+    its token-counting API; the result is the value to use as Tokenizer.scale.
+    """
+    encoder = get_encoding_by_name(encoding)
+    base = sum(_count_batch(encoder, [text], 1) for text in texts)
+    return sum(reference_counts) / base if base else 1.0
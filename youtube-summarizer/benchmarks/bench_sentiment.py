@@ -0,0 +1,58 @@
+"""Benchmark the batched sentiment engine against the original per-comment loop.
+
+Run from the youtube-summarizer folder:
+
+    python -m benchmarks.bench_sentiment            # 1k, 10k and 100k comments
+    python -m benchmarks.bench_sentiment 1000 5000  # custom sizes
+"""
+import os
+import random
+import sys
+import time
+from textblob import TextBlob
+
+# Make the shared aihub_common package importable when run from the project folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from aihub_common.processes import available_cpus
+from src.services.sentiment_service import score_comments, summarize_polarities
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+WORDS = (
+    "great awesome love terrible boring helpful confusing amazing bad good video "
+    "explanation thanks really not very the this was is audio editing example"
+).split()
+
+def make_comments(count, seed=0):
+    """Synthetic comments of 5-30 words drawn from a small sentiment-bearing vocabulary"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(5, 30))) for _ in range(count)]
+
+def legacy_analyze_sentiment(comments):
+    """The original AIService.analyze_sentiment loop"""
+    sentiments = []
+    for comment in comments:
+        analysis = TextBlob(comment)
+        sentiments.append(analysis.sentiment.polarity)
+    return sum(sentiments) / len(sentiments)
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    processes = available_cpus()
+    print(f"{'comments':>10} {'legacy loop':>12} {'batched':>12} {f'{processes} procs':>12}")
+    for size in sizes:
+        comments = make_comments(size)
+        legacy_time, legacy_mean = timed(legacy_analyze_sentiment, comments)
+        batched_time, polarities = timed(lambda: summarize_polarities(score_comments(comments)))
+        pool_time, pooled = timed(lambda: summarize_polarities(score_comments(comments, processes=processes)))
+        assert abs(polarities['mean_polarity'] - legacy_mean) < 1e-9
+        assert pooled['bucket_counts'] == polarities['bucket_counts']
+        print(f"{size:>10,} {legacy_time:>11.2f}s {batched_time:>11.2f}s {pool_time:>11.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,33 @@
+import os
+import sys
+
+# Make the shared aihub_common package importable when run from the project folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 import streamlit as st
-from src.services.youtube_service import YouTubeService
+from src.services.youtube_service import YouTubeService, CommentsDisabledError
 from src.services.ai_service import AIService
+from src.services.transcript_index import TranscriptIndex
 from src.utils.language_utils import detect_language
 from src.config.settings import (
     GOOGLE_API_KEY, 
     YOUTUBE_API_KEY,
-    TRANSLATION_LANGUAGES
+    TRANSLATION_LANGUAGES,
+    COMMENT_BUDGETS,
+    MAX_COMMENTS_FOR_ANALYSIS,
+    SENTIMENT_PARALLEL_THRESHOLD,
+    CHAT_WINDOW_SECONDS,
+    CHAT_TOP_K_WINDOWS
 )
-import requests
-from bs4 import BeautifulSoup
-import os
-import pyperclip
-from datetime import datetime, timedelta
+from aihub_common.cache import llm_cache_summary
+from aihub_common.services import get_service
+from aihub_common.lazy import lazy_import
+from aihub_common.processes import available_cpus
 import re
 
+# Only needed when the copy button is used
+pyperclip = lazy_import("pyperclip")
+
 # Load custom CSS and JavaScript
 def load_custom_css():
     with open('src/styles/custom.css') as f:
@@ -23,9 +37,9 @@ def load_custom_js():
     with open('src/styles/custom.js') as f:
         st.markdown(f'<script>{f.read()}</script>', unsafe_allow_html=True)
 
-# Initialize services
-st.session_state.youtube_service = YouTubeService()
-st.session_state.ai_service = AIService()
+# Initialize services (built once per process and API key, not on every rerun)
+st.session_state.youtube_service = get_service("youtube", YOUTUBE_API_KEY, YouTubeService)
+st.session_state.ai_service = get_service("ai", GOOGLE_API_KEY, AIService)
 
 # Set page config for better layout
 st.set_page_config(
@@ -50,6 +64,9 @@ if 'video_details' not in st.session_state:
     st.session_state.video_details = None
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
+if 'transcript_index' not in st.session_state:
+    st.session_state.transcript_index = None
+    st.session_state.transcript_index_video = None
 if 'loading' not in st.session_state:
     st.session_state.loading = False
 if 'url_submitted' not in st.session_state:
@@ -84,14 +101,16 @@ with st.sidebar:
     with st.expander("🔑 API Key Configuration", expanded=not bool(GOOGLE_API_KEY)):
         api_key = st.text_input("Google Gemini API Key", type="password", value=GOOGLE_API_KEY)
         if api_key:
-            st.session_state.ai_service = AIService()
+            st.session_state.ai_service = get_service("ai", api_key, AIService)
             st.success("✅ Gemini API Key configured successfully!")
             
         youtube_api_key = st.text_input("YouTube Data API Key", type="password", value=YOUTUBE_API_KEY)
         if youtube_api_key:
-            st.session_state.youtube_service = YouTubeService()
+            st.session_state.youtube_service = get_service("youtube", youtube_api_key, YouTubeService)
             st.success("✅ YouTube API Key configured successfully!")
 
+    st.caption(llm_cache_summary())
+
     with st.expander("📖 How to use"):
         st.markdown("""
             <div class="usage-guide">
@@ -263,30 +282,26 @@ if st.session_state.process_video and st.session_state.youtube_url:
                             st.error(transcript)
                             st.stop()
 
-                    # Generate summary using the prompt from ai_service
-                    summary = st.session_state.ai_service.generate_summary(st.session_state.transcript, word_count)
-                    
-                    if enable_translation:
-                        translated_summary = st.session_state.ai_service.translate_text(summary, target_language)
-                        st.markdown("""
-                            <div class='translation-section'>
-                                <h3>Translation to {}</h3>
-                                <div class='translated-content'>{}</div>
-                                <hr>
-                                <h3>Original Summary</h3>
-                                <div class='original-content'>{}</div>
-                            </div>
-                        """.format(target_language, translated_summary, summary), unsafe_allow_html=True)
-                    else:
-                        # Use st.markdown with markdown formatting
-                        st.markdown(summary)
-                        
-                        # Add copy button with formatted text
-                        if st.button("📋 Copy Summary"):
-                            # Format the summary for clipboard
-                            formatted_summary = summary.replace('## ', '\n## ').replace('# ', '\n# ')
-                            pyperclip.copy(formatted_summary)
-                            st.success("Summary copied to clipboard!")
+                # Long transcripts are summarized in parts first, then the summary is streamed
+                with st.spinner(""):
+                    summary_stream = st.session_state.ai_service.generate_summary_stream(
+                        st.session_state.transcript, word_count, video_id=video_id
+                    )
+                if enable_translation:
+                    st.markdown("### Original Summary")
+                summary = st.write_stream(summary_stream)
+                
+                if enable_translation:
+                    st.markdown("---")
+                    st.markdown(f"### Translation to {target_language}")
+                    st.write_stream(st.session_state.ai_service.translate_text_stream(summary, target_language))
+                else:
+                    # Add copy button with formatted text
+                    if st.button("📋 Copy Summary"):
+                        # Format the summary for clipboard
+                        formatted_summary = summary.replace('## ', '\n## ').replace('# ', '\n# ')
+                        pyperclip.copy(formatted_summary)
+                        st.success("Summary copied to clipboard!")
         
         with tab2:
             st.markdown("<h2 class='section-header'>💬 Chat with Video</h2>", unsafe_allow_html=True)
@@ -307,36 +322,48 @@ if st.session_state.process_video and st.session_state.youtube_url:
                 with st.chat_message("user"):
                     st.markdown(prompt)
                 
-                # Get video transcript if not already loaded
-                if not st.session_state.transcript:
-                    transcript = st.session_state.youtube_service.get_transcript(video_id)
-                    if "Error" not in transcript:
-                        st.session_state.transcript = transcript
+                # Build the time-window index once per video
+                if st.session_state.transcript_index_video != video_id:
+                    # Never answer from the previous video's index
+                    st.session_state.transcript_index = None
+                    st.session_state.transcript_index_video = None
+                    segments, error = st.session_state.youtube_service.get_transcript_segments(video_id)
+                    if segments:
+                        st.session_state.transcript = segments.text
+                        st.session_state.transcript_index = TranscriptIndex(segments, CHAT_WINDOW_SECONDS)
+                        st.session_state.transcript_index_video = video_id
+                    else:
+                        st.warning(f"Could not load the transcript: {error or 'no transcript available'}")
                 
                 # Generate AI response
                 with st.chat_message("assistant"):
-                    with st.spinner(""):
-                        # Create context-aware prompt with better instructions
-                        context_prompt = f"""
-                        You are an AI assistant analyzing a YouTube video. Based on the following video transcript, please provide a detailed and contextual answer to the user's question.
-                        Your response should:
-                        1. Be comprehensive and well-structured
-                        2. Include relevant quotes or examples from the video
-                        3. Connect different parts of the video content to provide a complete answer
-                        4. If the answer cannot be found in the transcript, clearly state that
-                        5. Use markdown formatting for better readability
+                    # Send only the parts of the video relevant to the question
+                    if st.session_state.transcript_index and st.session_state.transcript_index_video == video_id:
+                        excerpts = st.session_state.transcript_index.format_context(prompt, CHAT_TOP_K_WINDOWS)
+                    else:
+                        excerpts = "No transcript is available for this video."
+                    
+                    # Create context-aware prompt with better instructions
+                    context_prompt = f"""
+                    You are an AI assistant analyzing a YouTube video. Based on the following excerpts from the video transcript, please provide a detailed and contextual answer to the user's question.
+                    Each excerpt starts with the time range it covers in the video.
+                    Your response should:
+                    1. Be comprehensive and well-structured
+                    2. Include relevant quotes or examples from the video
+                    3. Cite the timestamp of each point you use, e.g. [12:34]
+                    4. If the answer cannot be found in the excerpts, clearly state that
+                    5. Use markdown formatting for better readability
 
-                        Question: {prompt}
+                    Question: {prompt}
 
-                        Video Transcript:
-                        {st.session_state.transcript}
+                    Transcript excerpts:
+                    {excerpts}
 
-                        Please provide a detailed answer:
-                        """
-                        
-                        response = st.session_state.ai_service.generate_response(context_prompt)
-                        st.markdown(response)
-                        st.session_state.chat_history.append({"role": "assistant", "content": response})
+                    Please provide a detailed answer:
+                    """
+                    
+                    response = st.write_stream(st.session_state.ai_service.generate_response_stream(context_prompt))
+                    st.session_state.chat_history.append({"role": "assistant", "content": response})
         
         with tab3:
             st.markdown("<h2 class='section-header'>📊 Comments Analysis</h2>", unsafe_allow_html=True)
@@ -353,41 +380,85 @@ if st.session_state.process_video and st.session_state.youtube_url:
                         key="comments_target_lang"
                     )
             
+            col1, col2, col3 = st.columns([1, 1, 1])
+            with col1:
+                comment_budget = st.selectbox(
+                    "Comments to analyze",
+                    COMMENT_BUDGETS,
+                    index=0,
+                    format_func=lambda n: f"{n:,}",
+                    key="comment_budget"
+                )
+            with col2:
+                comment_order = st.selectbox(
+                    "Order",
+                    ["relevance", "time"],
+                    format_func=str.title,
+                    key="comment_order"
+                )
+            with col3:
+                include_replies = st.checkbox("Include replies", value=False, key="comment_replies")
+            
             if st.button("Analyze Comments", use_container_width=True):
                 st.session_state.loading = True
+                # Score sentiment while pages stream in, keeping only a bounded sample for Gemini
+                comments = []
+                def sample_comments(comment_stream):
+                    for comment in comment_stream:
+                        if len(comments) < MAX_COMMENTS_FOR_ANALYSIS:
+                            comments.append(comment)
+                        yield comment
+                
                 with st.spinner("."):
-                    comments = st.session_state.youtube_service.get_video_comments(video_id)
-                    if comments:
-                        sentiment_analysis = st.session_state.ai_service.analyze_sentiment(comments)
-                        if sentiment_analysis:
-                            st.markdown("""
-                                <div class='sentiment-analysis'>
-                                    <h3>Overall Sentiment: {}</h3>
-                                    <p>Based on analysis of {} comments</p>
-                                </div>
-                            """.format(sentiment_analysis['category'], sentiment_analysis['total_comments']), unsafe_allow_html=True)
-                                
-                            comment_analysis = st.session_state.ai_service.analyze_comments(comments)
-                            if comment_analysis:
-                                if enable_translation:
-                                    translated_analysis = st.session_state.ai_service.translate_text(comment_analysis, target_language)
-                                    st.markdown("""
-                                        <div class='translation-section'>
-                                            <h3>Translation to {}</h3>
-                                            <div class='translated-content'>{}</div>
-                                            <hr>
-                                            <h3>Original ({})</h3>
-                                            <div class='original-content'>{}</div>
-                                        </div>
-                                    """.format(target_language, translated_analysis, st.session_state.detected_language, comment_analysis), unsafe_allow_html=True)
-                                else:
-                                    st.markdown("""
-                                        <div class='comment-analysis'>
-                                            {}
-                                        </div>
-                                    """.format(comment_analysis), unsafe_allow_html=True)
-                    else:
-                        st.warning("No comments available for analysis.")
+                    try:
+                        sentiment_analysis = st.session_state.ai_service.analyze_sentiment(
+                            sample_comments(st.session_state.youtube_service.iter_video_comments(
+                                video_id,
+                                max_comments=comment_budget,
+                                include_replies=include_replies,
+                                order=comment_order
+                            )),
+                            processes=available_cpus() if comment_budget >= SENTIMENT_PARALLEL_THRESHOLD else 1
+                        )
+                    except CommentsDisabledError:
+                        sentiment_analysis = None
+                if comments:
+                    if sentiment_analysis:
+                        st.markdown("""
+                            <div class='sentiment-analysis'>
+                                <h3>Overall Sentiment: {}</h3>
+                                <p>Based on analysis of {} comments</p>
+                            </div>
+                        """.format(sentiment_analysis['category'], sentiment_analysis['total_comments']), unsafe_allow_html=True)
+                        
+                        # Sentiment distribution
+                        bucket_cols = st.columns(len(sentiment_analysis['bucket_counts']))
+                        for bucket_col, (bucket, count) in zip(bucket_cols, sentiment_analysis['bucket_counts'].items()):
+                            bucket_col.metric(bucket, f"{count:,}")
+                        histogram = sentiment_analysis['histogram']
+                        st.bar_chart(
+                            {
+                                "Polarity": [round(edge, 1) for edge in histogram['bin_edges'][:-1]],
+                                "Comments": histogram['counts']
+                            },
+                            x="Polarity",
+                            y="Comments"
+                        )
+                        st.caption(
+                            f"Mean polarity {sentiment_analysis['mean_polarity']:+.3f} · "
+                            + " · ".join(f"p{pct}: {value:+.2f}" for pct, value in sentiment_analysis['percentiles'].items())
+                        )
+                        
+                        # Stream the analysis, then its translation if requested
+                        if enable_translation:
+                            st.markdown("### Original Analysis")
+                        comment_analysis = st.write_stream(st.session_state.ai_service.analyze_comments_stream(comments))
+                        if comment_analysis and enable_translation:
+                            st.markdown("---")
+                            st.markdown(f"### Translation to {target_language}")
+                            st.write_stream(st.session_state.ai_service.translate_text_stream(comment_analysis, target_language))
+                else:
+                    st.warning("No comments available for analysis.")
                 st.session_state.loading = False
         
         with tab4:
@@ -38,6 +38,28 @@ TRANSLATION_LANGUAGES = [
 # File size limits
 MAX_PDF_SIZE = 10 * 1024 * 1024  # 10MB in bytes
 
+# Comment analysis
+COMMENT_BUDGETS = [100, 1000, 10000]  # Choices for how many comments to fetch
+MAX_COMMENTS_FOR_ANALYSIS = 500  # Comments sent to Gemini for the written analysis
+SENTIMENT_BATCH_SIZE = 1000  # Comments scored per batch
+SENTIMENT_PARALLEL_THRESHOLD = 5000  # Budgets at or above this are scored in a process pool
+
+# Long transcript summarization (map-reduce)
+SUMMARY_SINGLE_PASS_TOKENS = 12000  # Transcripts up to this size are summarized in one call
+SUMMARY_CHUNK_TOKENS = 6000  # Transcript tokens per map-step chunk
+CHUNK_SUMMARY_WORDS = 250  # Target length of each chunk summary
+SUMMARY_MAX_WORKERS = 8  # Chunk summaries generated in parallel
+
+# Chat with video retrieval
+CHAT_WINDOW_SECONDS = 60  # Transcript is indexed in windows of about this length
+CHAT_TOP_K_WINDOWS = 6  # Windows sent with each question
+
+# Persistent YouTube store (transcripts, video and channel details)
+TRANSCRIPT_CACHE_TTL = 30 * 24 * 60 * 60  # 30 days; transcripts rarely change
+VIDEO_DETAILS_CACHE_TTL = 60 * 60  # 1 hour; view and like counts move quickly
+CHANNEL_DETAILS_CACHE_TTL = 24 * 60 * 60  # 1 day
+YOUTUBE_STORE_MAX_MB = 512
+
 # Language Configuration
 PREFERRED_LANGUAGES = [
     'en',  # English
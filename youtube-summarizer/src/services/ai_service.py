@@ -1,23 +1,97 @@
-import google.generativeai as genai
-from textblob import TextBlob
-from src.config.settings import GOOGLE_API_KEY, GEMINI_MODEL
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from src.config.settings import (
+    GOOGLE_API_KEY,
+    GEMINI_MODEL,
+    SENTIMENT_BATCH_SIZE,
+    SUMMARY_SINGLE_PASS_TOKENS,
+    SUMMARY_CHUNK_TOKENS,
+    CHUNK_SUMMARY_WORDS,
+    SUMMARY_MAX_WORKERS
+)
+from src.services.sentiment_service import score_comments, summarize_polarities
+from src.services.youtube_store import get_youtube_store
+from src.utils.text_utils import estimate_tokens, chunk_by_tokens
+from aihub_common.cache import cached_completion, cached_stream
+from aihub_common.services import configure_gemini, get_gemini_model
 
 class AIService:
-    def __init__(self):
-        genai.configure(api_key=GOOGLE_API_KEY)
-        self.model = genai.GenerativeModel(GEMINI_MODEL)
+    def __init__(self, api_key=None):
+        self.api_key = api_key or GOOGLE_API_KEY
+        self.model = get_gemini_model(self.api_key, GEMINI_MODEL)
+
+    def _generate(self, prompt):
+        """Generate text with Gemini, reusing the cached response for an identical prompt"""
+        configure_gemini(self.api_key)
+        return cached_completion(lambda: self.model.generate_content(prompt).text, GEMINI_MODEL, prompt)
+
+    def _generate_stream(self, prompt):
+        """Yield Gemini output as it arrives, reusing the cached response for an identical prompt"""
+        def stream():
+            configure_gemini(self.api_key)
+            for chunk in self.model.generate_content(prompt, stream=True):
+                try:
+                    yield chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. a trailing safety-ratings chunk)
+                    continue
+        return cached_stream(stream, GEMINI_MODEL, prompt)
 
     def generate_response(self, prompt):
         """Generate a response using Gemini for any given prompt"""
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
+            return self._generate(prompt)
         except Exception as e:
             raise Exception(f"Error generating response: {str(e)}")
 
-    def generate_summary(self, text, word_count):
-        """Generate summary using Gemini"""
-        prompt = f"""Please analyze the following text and create a comprehensive summary in approximately {word_count} words. Structure your response as follows:
+    def generate_response_stream(self, prompt):
+        """Stream a response using Gemini for any given prompt"""
+        return self._generate_stream(prompt)
+
+    @staticmethod
+    def _chunk_summary_prompt(chunk, part, total_parts):
+        return f"""The following is part {part} of {total_parts} of a long video transcript. Summarize it in approximately {CHUNK_SUMMARY_WORDS} words.
+Keep the key points, names, numbers, examples and conclusions, in the order they appear. Do not add an introduction or commentary.
+
+Transcript part {part}:
+{chunk}"""
+
+    def _map_summaries(self, chunks):
+        """Summarize chunks in parallel, preserving their order"""
+        prompts = [self._chunk_summary_prompt(chunk, i + 1, len(chunks)) for i, chunk in enumerate(chunks)]
+        with ThreadPoolExecutor(max_workers=min(SUMMARY_MAX_WORKERS, len(prompts))) as executor:
+            return list(executor.map(self._generate, prompts))
+
+    def _summary_input(self, text, video_id=None):
+        """Return text short enough to summarize in one call.
+
+        Long transcripts are split into token-bounded chunks that are summarized
+        in parallel (map); the joined chunk summaries are re-chunked and mapped
+        again until they fit, so every call stays within a bounded size. The first
+        level of chunk summaries is stored per video_id.
+        """
+        if estimate_tokens(text) <= SUMMARY_SINGLE_PASS_TOKENS:
+            return text
+        
+        store = get_youtube_store()
+        transcript_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+        summaries = store.get('chunk_summaries', video_id, transcript_hash) if video_id else None
+        if summaries is None:
+            summaries = self._map_summaries(chunk_by_tokens(text, SUMMARY_CHUNK_TOKENS))
+            if video_id:
+                store.set('chunk_summaries', video_id, summaries, transcript_hash)
+        
+        combined = "\n\n".join(summaries)
+        while estimate_tokens(combined) > SUMMARY_SINGLE_PASS_TOKENS:
+            reduced = "\n\n".join(self._map_summaries(chunk_by_tokens(combined, SUMMARY_CHUNK_TOKENS)))
+            if len(reduced) >= len(combined):
+                break
+            combined = reduced
+        return combined
+
+    @staticmethod
+    def _summary_prompt(text, word_count):
+        return f"""Please analyze the following text and create a comprehensive summary in approximately {word_count} words. Structure your response as follows:
 
 1. Title: Create a concise, engaging title that captures the main topic
 2. Brief Introduction: 2-3 sentences introducing the main topic and context
@@ -47,59 +121,54 @@ Please format your response as follows:
 
 ## Conclusion
 [Your conclusion here]"""
-        
-        response = self.model.generate_content(prompt)
-        return response.text
 
-    def translate_text(self, text, target_language):
-        """Translate text using Gemini"""
-        prompt = f"""Translate the following text to {target_language}:
+    def generate_summary(self, text, word_count, video_id=None):
+        """Generate summary using Gemini, map-reducing long transcripts"""
+        return self._generate(self._summary_prompt(self._summary_input(text, video_id), word_count))
+
+    def generate_summary_stream(self, text, word_count, video_id=None):
+        """Stream a summary using Gemini.
+
+        For long transcripts the map step runs before this returns; only the final
+        reduce step is streamed.
+        """
+        return self._generate_stream(self._summary_prompt(self._summary_input(text, video_id), word_count))
+
+    @staticmethod
+    def _translation_prompt(text, target_language):
+        return f"""Translate the following text to {target_language}:
 
 {text}
 
 Translation:"""
-        
-        response = self.model.generate_content(prompt)
-        return response.text
 
-    def analyze_sentiment(self, comments):
-        """Analyze sentiment of comments"""
-        if not comments:
+    def translate_text(self, text, target_language):
+        """Translate text using Gemini"""
+        return self._generate(self._translation_prompt(text, target_language))
+
+    def translate_text_stream(self, text, target_language):
+        """Stream a translation using Gemini"""
+        return self._generate_stream(self._translation_prompt(text, target_language))
+
+    def analyze_sentiment(self, comments, processes=1):
+        """Analyze sentiment of comments.
+
+        Accepts any iterable, including a generator of comments still being
+        fetched. Returns the overall category plus the polarity distribution
+        (bucket counts, percentiles and histogram); processes > 1 scores batches
+        in a process pool.
+        """
+        polarities = score_comments(comments, batch_size=SENTIMENT_BATCH_SIZE, processes=processes)
+        if not polarities.size:
             return None
-            
-        sentiments = []
-        for comment in comments:
-            analysis = TextBlob(comment)
-            sentiments.append(analysis.sentiment.polarity)
-        
-        avg_sentiment = sum(sentiments) / len(sentiments)
-        
-        # Categorize sentiment
-        if avg_sentiment > 0.2:
-            sentiment_category = "Very Positive"
-        elif avg_sentiment > 0:
-            sentiment_category = "Positive"
-        elif avg_sentiment < -0.2:
-            sentiment_category = "Very Negative"
-        elif avg_sentiment < 0:
-            sentiment_category = "Negative"
-        else:
-            sentiment_category = "Neutral"
-        
-        return {
-            'category': sentiment_category,
-            'total_comments': len(comments)
-        }
+        return summarize_polarities(polarities)
 
-    def analyze_comments(self, comments):
-        """Generate a comprehensive analysis of comments using Gemini"""
-        if not comments:
-            return None
-            
+    @staticmethod
+    def _comments_prompt(comments):
         # Prepare comments for analysis
         comments_text = "\n".join(comments)
         
-        prompt = f"""Analyze the following YouTube video comments and provide a comprehensive summary of user feedback. Focus on:
+        return f"""Analyze the following YouTube video comments and provide a comprehensive summary of user feedback. Focus on:
 
 1. Overall sentiment and general reception
 2. What users liked about the video
@@ -130,9 +199,19 @@ Please format your response as follows:
 ## Common Themes
 - [Recurring topics or points]
 - [Shared experiences or perspectives]"""
+
+    def analyze_comments(self, comments):
+        """Generate a comprehensive analysis of comments using Gemini"""
+        if not comments:
+            return None
         
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
+            return self._generate(self._comments_prompt(comments))
         except Exception as e:
-            raise Exception(f"Error analyzing comments: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"Error analyzing comments: {str(e)}")
+
+    def analyze_comments_stream(self, comments):
+        """Stream a comprehensive analysis of comments using Gemini"""
+        if not comments:
+            return None
+        return self._generate_stream(self._comments_prompt(comments)) 
\ No newline at end of file
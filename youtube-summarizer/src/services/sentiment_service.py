@@ -0,0 +1,80 @@
+from itertools import islice
+from aihub_common.lazy import lazy_import
+from aihub_common.processes import process_pool
+
+# Imported when comments are first scored
+np = lazy_import("numpy")
+textblob = lazy_import("textblob")
+
+# Polarity thresholds shared by per-comment buckets and the overall category
+VERY_NEGATIVE_BELOW = -0.2
+VERY_POSITIVE_ABOVE = 0.2
+
+HISTOGRAM_BIN_COUNT = 20  # 0.1-wide polarity bins over [-1, 1]
+PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
+
+def score_batch(comments):
+    """Return the TextBlob polarity of each comment in a batch as a float array"""
+    return np.fromiter(
+        (textblob.TextBlob(comment).sentiment.polarity for comment in comments),
+        dtype=np.float64,
+        count=len(comments)
+    )
+
+def iter_batches(comments, batch_size):
+    """Group any iterable of comments into lists of batch_size"""
+    iterator = iter(comments)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def score_comments(comments, batch_size=1000, processes=1):
+    """Score an iterable of comments into one polarity array.
+
+    Comments are consumed in batches, so a generator still fetching pages can be
+    scored as it goes. With processes > 1 the batches are scored in a process
+    pool (started without forking the Streamlit process); batches are submitted
+    as they are read from the iterable.
+    """
+    if processes and processes > 1:
+        with process_pool(processes) as executor:
+            scores = list(executor.map(score_batch, iter_batches(comments, batch_size)))
+    else:
+        scores = [score_batch(batch) for batch in iter_batches(comments, batch_size)]
+    return np.concatenate(scores) if scores else np.empty(0, dtype=np.float64)
+
+def categorize(polarity):
+    """Map a polarity score to a sentiment category"""
+    if polarity > VERY_POSITIVE_ABOVE:
+        return "Very Positive"
+    elif polarity > 0:
+        return "Positive"
+    elif polarity < VERY_NEGATIVE_BELOW:
+        return "Very Negative"
+    elif polarity < 0:
+        return "Negative"
+    return "Neutral"
+
+def summarize_polarities(polarities):
+    """Aggregate a polarity array into the sentiment distribution"""
+    mean_polarity = float(polarities.mean())
+    histogram_counts, bin_edges = np.histogram(polarities, bins=HISTOGRAM_BIN_COUNT, range=(-1.0, 1.0))
+    return {
+        'category': categorize(mean_polarity),
+        'total_comments': int(polarities.size),
+        'mean_polarity': mean_polarity,
+        'bucket_counts': {
+            "Very Negative": int(np.count_nonzero(polarities < VERY_NEGATIVE_BELOW)),
+            "Negative": int(np.count_nonzero((polarities >= VERY_NEGATIVE_BELOW) & (polarities < 0))),
+            "Neutral": int(np.count_nonzero(polarities == 0)),
+            "Positive": int(np.count_nonzero((polarities > 0) & (polarities <= VERY_POSITIVE_ABOVE))),
+            "Very Positive": int(np.count_nonzero(polarities > VERY_POSITIVE_ABOVE))
+        },
+        'percentiles': dict(zip(PERCENTILES, np.percentile(polarities, PERCENTILES).tolist())),
+        'histogram': {
+            'bin_edges': bin_edges.tolist(),
+            'counts': histogram_counts.tolist()
+        }
+    }
@@ -0,0 +1,98 @@
+from array import array
+from aihub_common.retrieval import BM25Index
+
+def format_timestamp(seconds):
+    """Format seconds as m:ss, or h:mm:ss for long videos"""
+    seconds = int(seconds)
+    hours, remainder = divmod(seconds, 3600)
+    minutes, secs = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+class TranscriptSegments:
+    """Transcript text with compact per-segment timing.
+
+    The text is the space-joined segment texts; starts, durations and offsets are
+    parallel arrays giving each segment's start time, duration (seconds) and
+    character offset into the text.
+    """
+
+    def __init__(self, text, starts, durations, offsets):
+        self.text = text
+        self.starts = array('d', starts)
+        self.durations = array('d', durations)
+        self.offsets = array('l', offsets)
+
+    @classmethod
+    def from_entries(cls, entries):
+        """Build from youtube_transcript_api entries ({'text', 'start', 'duration'})"""
+        parts, starts, durations, offsets = [], [], [], []
+        offset = 0
+        for entry in entries:
+            parts.append(entry['text'])
+            starts.append(entry['start'])
+            durations.append(entry.get('duration', 0.0))
+            offsets.append(offset)
+            offset += len(entry['text']) + 1
+        return cls(' '.join(parts), starts, durations, offsets)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['text'], data['starts'], data['durations'], data['offsets'])
+
+    def to_dict(self):
+        return {
+            'text': self.text,
+            'starts': self.starts.tolist(),
+            'durations': self.durations.tolist(),
+            'offsets': self.offsets.tolist()
+        }
+
+    def __len__(self):
+        return len(self.starts)
+
+    def end_time(self, index):
+        return self.starts[index] + self.durations[index]
+
+    def time_windows(self, window_seconds):
+        """Group consecutive segments into windows of about window_seconds.
+
+        Returns a list of (start, end, text) tuples.
+        """
+        windows = []
+        first = 0
+        for i in range(1, len(self) + 1):
+            if i == len(self) or self.starts[i] - self.starts[first] >= window_seconds:
+                end_offset = self.offsets[i] if i < len(self) else len(self.text) + 1
+                windows.append((
+                    self.starts[first],
+                    self.end_time(i - 1),
+                    self.text[self.offsets[first]:end_offset - 1]
+                ))
+                first = i
+        return windows
+
+class TranscriptIndex:
+    """BM25 index over time windows of a transcript, built once per video"""
+
+    def __init__(self, segments, window_seconds=60):
+        self.windows = segments.time_windows(window_seconds)
+        self.index = BM25Index([text for _, _, text in self.windows])
+
+    def search(self, query, top_k=6):
+        """Return the top_k (start, end, text) windows for a query, in time order.
+
+        Falls back to the opening windows if nothing matches.
+        """
+        hits = self.index.search(query, top_k)
+        if not hits:
+            return self.windows[:top_k]
+        return [self.windows[i] for i, _ in hits]
+
+    def format_context(self, query, top_k=6):
+        """Relevant windows formatted as '[m:ss - m:ss] text' blocks for a prompt"""
+        return "\n\n".join(
+            f"[{format_timestamp(start)} - {format_timestamp(end)}] {text}"
+            for start, end, text in self.search(query, top_k)
+        )
@@ -1,11 +1,38 @@
-from youtube_transcript_api import YouTubeTranscriptApi
 from googleapiclient.discovery import build
-from src.config.settings import YOUTUBE_API_KEY, PREFERRED_LANGUAGES
+from src.config.settings import YOUTUBE_API_KEY, PREFERRED_LANGUAGES, CHANNEL_DETAILS_CACHE_TTL
+from src.services.youtube_store import get_youtube_store
+from src.services.transcript_index import TranscriptSegments
+from aihub_common.lazy import lazy_import
 from datetime import datetime, timedelta
+import threading
+import time
+
+# Only needed once a transcript is fetched
+youtube_transcript_api = lazy_import("youtube_transcript_api")
+
+# Maximum number of ids the Data API accepts in one list request
+MAX_IDS_PER_REQUEST = 50
+
+class CommentsDisabledError(Exception):
+    """Raised when comments are turned off for a video"""
 
 class YouTubeService:
-    def __init__(self):
-        self.youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
+    def __init__(self, api_key=None):
+        self.api_key = api_key or YOUTUBE_API_KEY
+        # One API resource per thread: the service is shared by every Streamlit
+        # session, and the httplib2 client under each resource is not thread-safe
+        self._local = threading.local()
+        self.store = get_youtube_store()
+        # In-process channel cache: channel_id -> (fetched_at, channel data)
+        self._channel_cache = {}
+
+    @property
+    def youtube(self):
+        """The calling thread's YouTube Data API resource, built on first use"""
+        resource = getattr(self._local, 'youtube', None)
+        if resource is None:
+            resource = self._local.youtube = build('youtube', 'v3', developerKey=self.api_key)
+        return resource
 
     def get_video_id(self, url):
         """Extract video ID from YouTube URL"""
@@ -18,9 +45,51 @@ class YouTubeService:
                 return url.split('embed/')[-1].split('?')[0]
         return None
 
+    def get_channels_details(self, channel_ids):
+        """Get snippet and statistics for many channels, keyed by channel id.
+
+        Ids are deduplicated and served from the in-process cache or the persistent
+        store when fresh; the rest are fetched in batches of up to 50 per request.
+        """
+        now = time.time()
+        channels = {}
+        missing = []
+        for channel_id in dict.fromkeys(channel_ids):
+            cached = self._channel_cache.get(channel_id)
+            if cached and now - cached[0] < CHANNEL_DETAILS_CACHE_TTL:
+                channels[channel_id] = cached[1]
+                continue
+            channel_data = self.store.get('channel', channel_id)
+            if channel_data is not None:
+                self._channel_cache[channel_id] = (now, channel_data)
+                channels[channel_id] = channel_data
+            else:
+                missing.append(channel_id)
+        
+        for start in range(0, len(missing), MAX_IDS_PER_REQUEST):
+            batch = missing[start:start + MAX_IDS_PER_REQUEST]
+            channel_response = self.youtube.channels().list(
+                part='snippet,statistics',
+                id=','.join(batch),
+                maxResults=MAX_IDS_PER_REQUEST
+            ).execute()
+            for channel_data in channel_response.get('items', []):
+                self._channel_cache[channel_data['id']] = (now, channel_data)
+                self.store.set('channel', channel_data['id'], channel_data)
+                channels[channel_data['id']] = channel_data
+        return channels
+
+    def get_channel_details(self, channel_id):
+        """Get channel snippet and statistics for a single channel"""
+        return self.get_channels_details([channel_id])[channel_id]
+
     def get_video_details(self, video_id):
         """Get video details using YouTube Data API"""
         try:
+            video_details = self.store.get('video', video_id)
+            if video_details is not None:
+                return video_details
+            
             # Get video details
             video_response = self.youtube.videos().list(
                 part='snippet,statistics',
@@ -33,83 +102,154 @@ class YouTubeService:
             video_data = video_response['items'][0]
             
             # Get channel details
-            channel_id = video_data['snippet']['channelId']
-            channel_response = self.youtube.channels().list(
-                part='snippet,statistics',
-                id=channel_id
-            ).execute()
+            channel_data = self.get_channel_details(video_data['snippet']['channelId'])
             
-            channel_data = channel_response['items'][0]
-            
-            return {
+            video_details = {
                 'title': video_data['snippet']['title'],
                 'thumbnail': video_data['snippet']['thumbnails']['high']['url'],
                 'channel_name': channel_data['snippet']['title'],
-                'channel_subscribers': int(channel_data['statistics']['subscriberCount']),
+                'channel_subscribers': int(channel_data['statistics'].get('subscriberCount', 0)),
                 'video_views': int(video_data['statistics']['viewCount']),
                 'video_likes': int(video_data['statistics'].get('likeCount', 0)),
                 'published_date': video_data['snippet']['publishedAt']
             }
+            self.store.set('video', video_id, video_details)
+            return video_details
         except Exception as e:
             raise Exception(f"Error fetching video details: {str(e)}")
 
-    def get_video_comments(self, video_id):
-        """Get comments from YouTube video"""
+    def iter_video_comments(self, video_id, max_comments=1000, include_replies=False, order='relevance'):
+        """Yield comment texts from a YouTube video as each page arrives.
+
+        Pages through commentThreads 100 at a time until max_comments have been
+        yielded. With include_replies, each thread's replies follow its top-level
+        comment (paging through comments().list when more than the 5 inline
+        replies exist). order is 'relevance' or 'time'. Only one page is held in
+        memory at a time.
+
+        Raises CommentsDisabledError if comments are turned off for the video.
+        """
         try:
             request = self.youtube.commentThreads().list(
-                part="snippet",
+                part="snippet,replies" if include_replies else "snippet",
                 videoId=video_id,
-                maxResults=100
+                maxResults=100,
+                order=order,
+                textFormat="plainText"
             )
-            
-            comments = []
-            response = request.execute()
-            
-            while request and len(comments) < 100:
+            count = 0
+            while request is not None and count < max_comments:
+                response = request.execute()
                 for item in response['items']:
-                    comment = item['snippet']['topLevelComment']['snippet']['textDisplay']
-                    comments.append(comment)
+                    yield item['snippet']['topLevelComment']['snippet']['textDisplay']
+                    count += 1
+                    if count >= max_comments:
+                        return
                     
-                request = self.youtube.commentThreads().list_next(request, response)
+                    if include_replies and item['snippet'].get('totalReplyCount', 0):
+                        for reply in self._iter_replies(item):
+                            yield reply
+                            count += 1
+                            if count >= max_comments:
+                                return
                 
-            return comments[:100]
+                request = self.youtube.commentThreads().list_next(request, response)
         except Exception as e:
             if "commentsDisabled" in str(e):
-                return "COMMENTS_DISABLED"
+                raise CommentsDisabledError(f"Comments are disabled for video {video_id}") from e
             raise Exception(f"Error fetching comments: {str(e)}")
 
-    def get_transcript(self, video_id):
-        """Get transcript from YouTube video"""
+    def _iter_replies(self, thread):
+        """Yield reply texts for a comment thread"""
+        inline_replies = thread.get('replies', {}).get('comments', [])
+        if thread['snippet']['totalReplyCount'] <= len(inline_replies):
+            for reply in inline_replies:
+                yield reply['snippet']['textDisplay']
+            return
+        
+        # More replies than the thread includes inline, page through all of them
+        request = self.youtube.comments().list(
+            part="snippet",
+            parentId=thread['id'],
+            maxResults=100,
+            textFormat="plainText"
+        )
+        while request is not None:
+            response = request.execute()
+            for reply in response['items']:
+                yield reply['snippet']['textDisplay']
+            request = self.youtube.comments().list_next(request, response)
+
+    def get_video_comments(self, video_id, max_comments=100):
+        """Get comments from YouTube video"""
         try:
-            transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+            return list(self.iter_video_comments(video_id, max_comments=max_comments))
+        except CommentsDisabledError:
+            return "COMMENTS_DISABLED"
+
+    def get_transcript_segments(self, video_id, language=None):
+        """Get the transcript with per-segment timing as TranscriptSegments.
+
+        With a language code only that language is tried; otherwise the preferred
+        languages fallback chain is used. Successful results are kept in the
+        persistent store. Returns (segments, None) or (None, error message).
+        """
+        store_language = language or 'auto'
+        cached = self.store.get('transcript', video_id, store_language)
+        if isinstance(cached, dict):
+            return TranscriptSegments.from_dict(cached), None
+        
+        entries, error = self._fetch_transcript(video_id, language)
+        if error:
+            return None, error
+        segments = TranscriptSegments.from_entries(entries)
+        self.store.set('transcript', video_id, segments.to_dict(), store_language)
+        return segments, None
+
+    def get_transcript(self, video_id, language=None):
+        """Get transcript from YouTube video as a single string, or an error message"""
+        segments, error = self.get_transcript_segments(video_id, language)
+        return error if error else segments.text
+
+    def _fetch_transcript(self, video_id, language=None):
+        """Fetch transcript entries from YouTube, returning (entries, None) or (None, error message)"""
+        try:
+            transcript_list = youtube_transcript_api.YouTubeTranscriptApi.list_transcripts(video_id)
+            
+            if language:
+                try:
+                    transcript = transcript_list.find_transcript([language])
+                    return transcript.fetch(), None
+                except:
+                    return None, f"Error: No {language} transcript found for this video."
             
             # Try to find transcript in preferred languages
             for lang_code in PREFERRED_LANGUAGES:
                 try:
                     transcript = transcript_list.find_transcript([lang_code])
-                    return ' '.join([entry['text'] for entry in transcript.fetch()])
+                    return transcript.fetch(), None
                 except:
                     continue
             
             # If no manual transcript found, try auto-generated ones
             try:
                 transcript = transcript_list.find_manually_created_transcript()
-                return ' '.join([entry['text'] for entry in transcript.fetch()])
+                return transcript.fetch(), None
             except:
                 # If no manual transcript, try auto-generated ones
                 try:
                     transcript = transcript_list.find_generated_transcript(PREFERRED_LANGUAGES)
-                    return ' '.join([entry['text'] for entry in transcript.fetch()])
+                    return transcript.fetch(), None
                 except:
                     # If still no transcript, try to translate from any available language
                     try:
                         transcript = transcript_list.find_transcript(['en'])
-                        return ' '.join([entry['text'] for entry in transcript.fetch()])
+                        return transcript.fetch(), None
                     except:
-                        return "Error: No transcripts found for this video. Please try a different video."
+                        return None, "Error: No transcripts found for this video. Please try a different video."
                         
         except Exception as e:
-            return f"Error getting transcript: {str(e)}"
+            return None, f"Error getting transcript: {str(e)}"
 
     def get_trending_videos(self, category_id=None, max_results=5):
         """Get trending videos from YouTube.
@@ -133,19 +273,14 @@ class YouTubeService:
             response = request.execute()
             trending_videos = []
             
+            # Get channel details for all videos in batched requests
+            channels = self.get_channels_details(item['snippet']['channelId'] for item in response['items'])
+            
             for item in response['items']:
                 video_id = item['id']
                 snippet = item['snippet']
                 statistics = item['statistics']
-                
-                # Get channel details
-                channel_id = snippet['channelId']
-                channel_request = self.youtube.channels().list(
-                    part="statistics",
-                    id=channel_id
-                )
-                channel_response = channel_request.execute()
-                channel_stats = channel_response['items'][0]['statistics']
+                channel_stats = channels.get(snippet['channelId'], {}).get('statistics', {})
                 
                 trending_videos.append({
                     'video_id': video_id,
@@ -0,0 +1,52 @@
+import os
+import threading
+from aihub_common.cache import SQLiteCache, cache_dir
+from src.config.settings import (
+    TRANSCRIPT_CACHE_TTL,
+    VIDEO_DETAILS_CACHE_TTL,
+    CHANNEL_DETAILS_CACHE_TTL,
+    YOUTUBE_STORE_MAX_MB
+)
+
+class YouTubeStore:
+    """Persistent store of transcripts, video details and channel details.
+
+    Backed by a compressed SQLite cache so results survive Streamlit restarts and
+    are shared by every session on the machine. Each kind of record has its own TTL.
+    """
+
+    TTLS = {
+        'transcript': TRANSCRIPT_CACHE_TTL,
+        'video': VIDEO_DETAILS_CACHE_TTL,
+        'channel': CHANNEL_DETAILS_CACHE_TTL,
+        'chunk_summaries': TRANSCRIPT_CACHE_TTL
+    }
+
+    def __init__(self, path=None):
+        self.cache = SQLiteCache(
+            path or os.path.join(cache_dir(), 'youtube_store.sqlite3'),
+            max_bytes=YOUTUBE_STORE_MAX_MB * 1024 * 1024
+        )
+
+    @staticmethod
+    def _key(kind, item_id, language):
+        return f"{kind}:{item_id}:{language}"
+
+    def get(self, kind, item_id, language=''):
+        """Return the stored record, or None if missing or expired"""
+        return self.cache.get(self._key(kind, item_id, language))
+
+    def set(self, kind, item_id, value, language=''):
+        """Store a record with the TTL configured for its kind"""
+        self.cache.set(self._key(kind, item_id, language), value, ttl=self.TTLS[kind])
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_youtube_store():
+    """Return the process-wide YouTube store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = YouTubeStore()
+        return _store
@@ -1,10 +1,12 @@
-from langdetect import detect
+from aihub_common.lazy import lazy_import
 from src.config.settings import LANGUAGE_NAMES
 
+langdetect = lazy_import("langdetect")
+
 def detect_language(text):
     """Detect the language of the text"""
     try:
-        lang_code = detect(text)
+        lang_code = langdetect.detect(text)
         return LANGUAGE_NAMES.get(lang_code, 'Unknown')
     except:
         return 'Unknown' 
\ No newline at end of file
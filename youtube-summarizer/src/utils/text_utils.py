@@ -0,0 +1,23 @@
+# Rough characters-per-token ratio for English text with Gemini/GPT-style tokenizers
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text):
+    """Estimate the number of tokens in text"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def chunk_by_tokens(text, max_tokens):
+    """Split text at word boundaries into chunks of at most roughly max_tokens tokens"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = []
+    current_chars = 0
+    for word in text.split():
+        if current and current_chars + len(word) + 1 > max_chars:
+            chunks.append(' '.join(current))
+            current = []
+            current_chars = 0
+        current.append(word)
+        current_chars += len(word) + 1
+    if current:
+        chunks.append(' '.join(current))
+    return chunks